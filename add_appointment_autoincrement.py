@@ -0,0 +1,47 @@
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+from db import get_db
+from models import Appointment
+
+# SQLite reuses the largest rowid once that row is deleted, so an appointment
+# booked after the newest one was archived got the archived row's id back.
+# Rebuild the table with AUTOINCREMENT and start its counter above every id
+# already used in either table. SQLite can't add AUTOINCREMENT in place.
+conn = get_db()
+dialect = sqlite.dialect()
+table = Appointment.__table__
+existing = [row['name'] for row in conn.execute("PRAGMA table_info(appointment)")]
+columns = ', '.join(c.name for c in table.columns if c.name in existing)
+
+# Off while the old table is dropped, or waitlist.appointment_id would be nulled
+conn.execute("PRAGMA foreign_keys=OFF")
+try:
+    with conn:
+        conn.execute(str(CreateTable(table).compile(dialect=dialect)).replace(
+            'CREATE TABLE appointment', 'CREATE TABLE appointment_new', 1))
+        conn.execute(f"INSERT INTO appointment_new ({columns}) SELECT {columns} FROM appointment")
+        conn.execute("DROP TABLE appointment")
+        conn.execute("ALTER TABLE appointment_new RENAME TO appointment")
+        for index in table.indexes:
+            conn.execute(str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect)))
+
+        # Hot rows that already took an archived id get a new one
+        clashes = [row[0] for row in conn.execute(
+            "SELECT id FROM appointment WHERE id IN (SELECT id FROM appointment_archive) ORDER BY id")]
+        top = conn.execute("SELECT MAX(m) FROM (SELECT MAX(id) AS m FROM appointment "
+                           "UNION ALL SELECT MAX(id) FROM appointment_archive)").fetchone()[0] or 0
+        referencing = [name for name in ('waitlist', 'idempotency_key') if conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)).fetchone()]
+        for old_id in clashes:
+            top += 1
+            conn.execute("UPDATE appointment SET id=? WHERE id=?", (top, old_id))
+            for name in referencing:
+                conn.execute(f"UPDATE {name} SET appointment_id=? WHERE appointment_id=?", (top, old_id))
+            print(f"Appointment {old_id} clashed with an archived appointment and is now {top}.")
+
+        conn.execute("DELETE FROM sqlite_sequence WHERE name='appointment'")
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('appointment', ?)", (top,))
+finally:
+    conn.execute("PRAGMA foreign_keys=ON")
+
+print("Appointment table rebuilt with AUTOINCREMENT.")
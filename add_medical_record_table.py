@@ -0,0 +1,33 @@
+from db import execute, query_all
+
+# Append-only medical history per pet (replaces the overwritten pet.medical_history)
+execute("""
+CREATE TABLE IF NOT EXISTS medical_record (
+    id INTEGER PRIMARY KEY,
+    pet_id INTEGER NOT NULL REFERENCES pet(id) ON DELETE CASCADE,
+    created_at DATETIME NOT NULL,
+    author_id INTEGER REFERENCES user(id) ON DELETE SET NULL,
+    author_name VARCHAR(80),
+    entry TEXT NOT NULL
+);
+""")
+execute("CREATE INDEX IF NOT EXISTS ix_medical_record_pet_created ON medical_record (pet_id, created_at);")
+
+# Denormalized summary of the latest entry, so pet lists never read the full history
+execute("ALTER TABLE pet ADD COLUMN medical_summary VARCHAR(255);")
+execute("ALTER TABLE pet ADD COLUMN medical_updated_at DATETIME;")
+
+# Carry the existing text over as each pet's first entry
+for pet in query_all("SELECT id, owner_id, medical_history FROM pet WHERE medical_history IS NOT NULL AND medical_history != ''"):
+    entry = pet['medical_history'].strip()
+    summary = ' '.join(entry.split())
+    if len(summary) > 255:
+        summary = summary[:252].rstrip() + '...'
+    execute("INSERT INTO medical_record (pet_id, created_at, author_id, author_name, entry) "
+            "VALUES (?, CURRENT_TIMESTAMP, ?, 'Imported', ?);", (pet['id'], pet['owner_id'], entry))
+    execute("UPDATE pet SET medical_summary = ?, medical_updated_at = CURRENT_TIMESTAMP WHERE id = ?;",
+            (summary, pet['id']))
+
+execute("ALTER TABLE pet DROP COLUMN medical_history;")
+
+print("Medical records table created and existing history migrated.")
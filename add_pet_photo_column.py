@@ -0,0 +1,6 @@
+from db import execute
+
+# Add photo column to pet table (token of the files in instance/uploads/pets)
+execute("ALTER TABLE pet ADD COLUMN photo VARCHAR(32);")
+
+print("Photo column added to pet table.")
@@ -0,0 +1,10 @@
+from db import execute
+
+# Add staff_id column to appointment table (assigned by scheduler.py)
+execute("ALTER TABLE appointment ADD COLUMN staff_id INTEGER REFERENCES staff(id) ON DELETE SET NULL;")
+execute("CREATE INDEX IF NOT EXISTS ix_appointment_staff_id ON appointment (staff_id);")
+
+# Index used by the per-day staff board and load lookups
+execute("CREATE INDEX IF NOT EXISTS ix_appointment_scheduled_at ON appointment (scheduled_at);")
+
+print("Staff column and indexes added to appointment table.")
@@ -0,0 +1,206 @@
+"""Admin view functions. Imported on the first admin request; see admin.py."""
+from datetime import date, datetime, timedelta
+from flask import render_template, redirect, url_for, flash, request
+from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+from config import service_prices
+from extensions import db
+from models import User, Pet, Appointment, AuditEntry, ScheduleException
+from audit import audit_log, snapshot
+from archive import appointments_with_history, service_counts
+from scheduler import daily_board
+from booking_rules import DAY_NAMES, describe, reload_rules, rules
+from waitlist import PROMOTION_QUERIES, promote_waitlist
+from reports import PERIODS, DIMENSIONS, default_window, revenue_report
+from forms import RegistrationForm, ScheduleExceptionForm
+from auth import admin_required
+from query_budget import query_budget
+
+
+@login_required
+@admin_required
+def admin_dashboard():
+    include_history = request.args.get('history') == '1'
+    total_users = User.query.count()
+    total_pets = Pet.query.count()
+
+    # Calculate total payable for all scheduled appointments (archived ones only on request)
+    counts = service_counts(include_history)
+    total_appointments = sum(counts.values())
+    subtotal = sum(float(service_prices.get(service, 0.0)) * n for service, n in counts.items())
+    vat = round(subtotal * 0.12, 2)
+    total_payable = round(subtotal + vat, 2)
+
+    return render_template('admin_dashboard.html', total_users=total_users, total_pets=total_pets, total_appointments=total_appointments, total_payable=total_payable, include_history=include_history)
+
+@login_required
+@admin_required
+def admin_users():
+    users = User.query.all()
+    return render_template('admin_users.html', users=users)
+
+@login_required
+@admin_required
+def admin_user_edit(id):
+    user = User.query.get_or_404(id)
+    form = RegistrationForm(obj=user)
+    if form.validate_on_submit():
+        before = snapshot(user, exclude=('password',))
+        password_changed = user.password != form.password.data
+        user.name = form.name.data
+        user.email = form.email.data
+        user.password = form.password.data
+        db.session.commit()
+        after = snapshot(user, exclude=('password',))
+        after['password_changed'] = password_changed
+        audit_log.record('user.edit', 'user', user.id, before, after)
+        flash('User updated successfully.', 'success')
+        return redirect(url_for('admin.admin_users'))
+    return render_template('admin_user_form.html', form=form, title='Edit User', form_action=url_for('admin.admin_user_edit', id=id))
+
+@query_budget(16 + PROMOTION_QUERIES)  # a user with one pet
+@login_required
+@admin_required
+def admin_user_delete(id):
+    user = User.query.get_or_404(id)
+    if user.id == current_user.id:
+        flash('Cannot delete yourself.', 'danger')
+        return redirect(url_for('admin.admin_users'))
+    before = snapshot(user, exclude=('password',))
+    db.session.delete(user)
+    db.session.commit()
+    promote_waitlist()
+    audit_log.record('user.delete', 'user', id, before)
+    flash('User deleted successfully.', 'info')
+    return redirect(url_for('admin.admin_users'))
+
+@query_budget(3)
+@login_required
+@admin_required
+def admin_pets():
+    pets = Pet.query.options(joinedload(Pet.owner)).all()
+    return render_template('admin_pets.html', pets=pets)
+
+@query_budget(4)
+@login_required
+@admin_required
+def admin_appointments():
+    include_history = request.args.get('history') == '1'
+    appointments, history = appointments_with_history(include_history, request.args.get('page', 1, type=int))
+
+    # Attach prices and total payable to each appointment
+    for a in appointments:
+        price = float(service_prices.get(a.service, 0.0))
+        a.price = price
+        a.total_payable = round(price * 1.12, 2)  # 12% VAT
+
+    return render_template('admin_appointments.html', appointments=appointments, include_history=include_history,
+                           history=history)
+
+@login_required
+@admin_required
+def admin_board():
+    try:
+        day = datetime.strptime(request.args.get('date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        day = date.today()
+    return render_template('admin_board.html', day=day, board=daily_board(day),
+                           prev_day=day - timedelta(days=1), next_day=day + timedelta(days=1))
+
+@login_required
+@admin_required
+def admin_reports():
+    start, end = default_window()
+    try:
+        if request.args.get('start'):
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+        if request.args.get('end'):
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() + timedelta(days=1)
+    except ValueError:
+        flash('Dates must be in YYYY-MM-DD format.', 'warning')
+    period = request.args.get('period', 'month')
+    by = request.args.get('by', 'service')
+    if period not in PERIODS or by not in DIMENSIONS:
+        period, by = 'month', 'service'
+    rows = revenue_report(start, end, period, by)
+    totals = {name: round(sum(r[name] for r in rows), 2) for name in ('count', 'minutes', 'subtotal', 'vat', 'total', 'outstanding', 'cancelled')}
+    return render_template('admin_reports.html', rows=rows, totals=totals, start=start, end=end - timedelta(days=1),
+                           period=period, by=by, periods=PERIODS, dimensions=DIMENSIONS)
+
+@query_budget(5 + PROMOTION_QUERIES)
+@login_required
+@admin_required
+def admin_appointment_delete(id):
+    appointment = Appointment.query.get_or_404(id)
+    before = snapshot(appointment)
+    db.session.delete(appointment)
+    db.session.commit()
+    promote_waitlist()
+    audit_log.record('appointment.delete', 'appointment', id, before)
+    flash('Appointment deleted successfully.', 'info')
+    return redirect(url_for('admin.admin_appointments'))
+
+@query_budget(11 + PROMOTION_QUERIES)
+@login_required
+@admin_required
+def admin_pet_delete(id):
+    pet = Pet.query.get_or_404(id)
+    before = snapshot(pet)
+    db.session.delete(pet)
+    db.session.commit()
+    promote_waitlist()
+    audit_log.record('pet.delete', 'pet', id, before)
+    flash('Pet deleted successfully.', 'info')
+    return redirect(url_for('admin.admin_pets'))
+
+@login_required
+@admin_required
+def admin_audit():
+    # Make this worker's pending entries visible before reading
+    audit_log.flush()
+    query = AuditEntry.query
+    action = request.args.get('action')
+    if action:
+        query = query.filter_by(action=action)
+    target_type = request.args.get('target_type')
+    if target_type:
+        query = query.filter_by(target_type=target_type)
+    target_id = request.args.get('target_id', type=int)
+    if target_id is not None:
+        query = query.filter_by(target_id=target_id)
+    page = query.order_by(AuditEntry.id.desc()).paginate(page=request.args.get('page', 1, type=int),
+                                                         per_page=50, error_out=False)
+    filters = {k: v for k, v in (('action', action), ('target_type', target_type), ('target_id', target_id)) if v}
+    return render_template('admin_audit.html', page=page, filters=filters)
+
+@login_required
+@admin_required
+def admin_hours():
+    form = ScheduleExceptionForm()
+    if form.validate_on_submit():
+        exception = ScheduleException.query.filter_by(day=form.day.data).first() or ScheduleException(day=form.day.data)
+        before = snapshot(exception) if exception.id else None
+        exception.opens = form.opens.data
+        exception.closes = form.closes.data
+        exception.reason = form.reason.data or None
+        db.session.add(exception)
+        db.session.commit()
+        reload_rules()
+        audit_log.record('hours.exception', 'schedule_exception', exception.id, before, snapshot(exception))
+        flash(f'Hours for {exception.day:%B %d, %Y} saved.', 'success')
+        return redirect(url_for('admin.admin_hours'))
+    weekly = [(name, describe(table.intervals) or 'Closed') for name, table in zip(DAY_NAMES, rules().weekdays)]
+    exceptions = ScheduleException.query.filter(ScheduleException.day >= date.today()).order_by(ScheduleException.day).all()
+    return render_template('admin_hours.html', form=form, weekly=weekly, exceptions=exceptions)
+
+@login_required
+@admin_required
+def admin_hours_delete(id):
+    exception = ScheduleException.query.get_or_404(id)
+    before = snapshot(exception)
+    db.session.delete(exception)
+    db.session.commit()
+    reload_rules()
+    audit_log.record('hours.exception_delete', 'schedule_exception', id, before)
+    flash('Regular hours restored for that date.', 'info')
+    return redirect(url_for('admin.admin_hours'))
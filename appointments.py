@@ -0,0 +1,224 @@
+from datetime import date, datetime, timedelta
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
+from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+from config import service_prices
+from extensions import db, csrf
+from models import Appointment, WaitlistEntry
+from forms import AppointmentForm
+from query_budget import query_budget
+from booking_rules import clinic_hours_error, next_slots
+from scheduler import assign_staff, confirm_staff, staff_hours_error
+from waitlist import PROMOTION_QUERIES, join_waitlist, cancel_entry, promote_waitlist
+
+appointments_bp = Blueprint('appointments', __name__)
+
+
+def hours_message(error, scheduled_at):
+    """The clinic-hours error plus the next times that can be booked."""
+    slots = next_slots(max(scheduled_at, datetime.combine(date.today() + timedelta(days=1), datetime.min.time())))
+    if slots:
+        error += ' Next available: ' + ', '.join(f'{s:%a %b %d %I:%M %p}' for s in slots) + '.'
+    return error
+
+
+@appointments_bp.route('/appointments')
+@query_budget(3)
+@login_required
+def appointments_list():
+    appointments = (Appointment.query.options(joinedload(Appointment.pet))
+                    .filter_by(owner_id=current_user.id).order_by(Appointment.scheduled_at).all())
+
+    waiting = (WaitlistEntry.query.options(joinedload(WaitlistEntry.pet))
+               .filter_by(owner_id=current_user.id, status='Waiting')
+               .filter(WaitlistEntry.day >= date.today())  # past days can no longer be filled
+               .order_by(WaitlistEntry.requested_at).all())
+
+    # Attach prices and total payable to each appointment
+    for a in appointments:
+        a.price = float(service_prices.get(a.service, 0.0))
+        a.total_payable = round(a.price * 1.12, 2)
+
+    # Compute subtotal, VAT (12%), and total payable
+    subtotal = sum(a.price for a in appointments)
+    vat = round(subtotal * 0.12, 2)
+    total_payable = round(subtotal + vat, 2)
+
+    return render_template(
+        'appointments.html',
+        appointments=appointments,
+        waiting=waiting,
+        subtotal=subtotal,
+        vat=vat,
+        total_payable=total_payable
+    )
+
+@appointments_bp.route('/appointments/new', methods=['GET', 'POST'])
+@login_required
+def appointment_new():
+    form = AppointmentForm()
+    form.pet_id.choices = [(p.id, p.name) for p in current_user.pets]
+    if not form.pet_id.choices:
+        flash('Add a pet first.', 'warning')
+        return redirect(url_for('pets.pet_new'))
+
+    if form.validate_on_submit():
+        now = datetime.now()
+        scheduled_date = form.scheduled_at.data
+
+        # Prevent scheduling for today or past days
+        if scheduled_date.date() <= now.date():
+            flash('You cannot schedule an appointment for today or past dates. Please choose a future date.', 'danger')
+            return render_template('appointment_form.html', form=form, title='Book Appointment',
+                                   form_action=url_for('appointments.appointment_new'))
+
+        # Validate clinic hours
+        error = clinic_hours_error(scheduled_date)
+        if error:
+            flash(hours_message(error, scheduled_date), 'danger')
+            return render_template('appointment_form.html', form=form, title='Book Appointment',
+                                   form_action=url_for('appointments.appointment_new'))
+
+        # A booking that runs past staff hours can never be filled, so no waitlist
+        error = staff_hours_error(form.service.data, scheduled_date)
+        if error:
+            flash(error, 'danger')
+            return render_template('appointment_form.html', form=form, title='Book Appointment',
+                                   form_action=url_for('appointments.appointment_new'))
+
+        # Assign the least-loaded qualified staff member who is free then
+        staff_id = assign_staff(form.service.data, scheduled_date)
+        if staff_id is None:
+            if form.join_waitlist.data:
+                join_waitlist(form.pet_id.data, current_user.id, form.service.data, scheduled_date,
+                              form.urgency.data, form.notes.data, form.payment_method.data)
+                flash(f'You are on the waitlist for {form.service.data} on {scheduled_date:%B %d}. '
+                      'We will book you automatically if a slot opens that day.', 'info')
+                return redirect(url_for('appointments.appointments_list'))
+            flash(f'No staff are available for {form.service.data} at that time. '
+                  'Please choose another time or join the waitlist.', 'danger')
+            return render_template('appointment_form.html', form=form, title='Book Appointment',
+                                   form_action=url_for('appointments.appointment_new'), offer_waitlist=True)
+
+        appt = Appointment(
+            staff_id=staff_id,
+            pet_id=form.pet_id.data,
+            owner_id=current_user.id,
+            service=form.service.data,
+            scheduled_at=scheduled_date,
+            notes=form.notes.data,
+            payment_method=form.payment_method.data
+        )
+        if form.payment_method.data == 'pay_on_site':
+            appt.payment_status = 'Pending Payment (On-site)'
+            appt.status = 'Scheduled'
+        elif form.payment_method.data == 'pay_now':
+            appt.payment_status = 'Pending'
+            appt.status = 'Pending Payment'
+        db.session.add(appt)
+        if confirm_staff(appt) is None:
+            # Taken by a concurrent booking since assign_staff above
+            db.session.rollback()
+            flash(f'No staff are available for {form.service.data} at that time. '
+                  'Please choose another time or join the waitlist.', 'danger')
+            return render_template('appointment_form.html', form=form, title='Book Appointment',
+                                   form_action=url_for('appointments.appointment_new'), offer_waitlist=True)
+        db.session.commit()
+        if form.payment_method.data == 'pay_now':
+            # Calculate amount
+            price = float(service_prices.get(form.service.data, 0.0))
+            total_payable = round(price * 1.12, 2)  # 12% VAT
+            return redirect(url_for('payments.payment', appointment_id=appt.id, amount=total_payable))
+        flash('Appointment booked successfully!', 'success')
+        return redirect(url_for('appointments.appointments_list'))
+
+    return render_template('appointment_form.html', form=form, title='Book Appointment',
+                           form_action=url_for('appointments.appointment_new'))
+
+@appointments_bp.route('/appointments/<int:id>/edit', methods=['GET', 'POST'])
+@query_budget(8 + PROMOTION_QUERIES)
+@login_required
+def appointment_edit(id):
+    appt = Appointment.query.get_or_404(id)
+    if appt.owner != current_user:
+        abort(403)
+
+    form = AppointmentForm(obj=appt)
+    form.pet_id.choices = [(p.id, p.name) for p in current_user.pets]
+
+    if request.method == 'GET':
+        form.scheduled_at.data = appt.scheduled_at
+        form.payment_method.data = appt.payment_method
+
+    if form.validate_on_submit():
+        now = datetime.now()
+        scheduled_date = form.scheduled_at.data
+
+        # Prevent editing to today or past
+        if scheduled_date.date() <= now.date():
+            flash('You cannot set the appointment to today or a past date. Please choose a future date.', 'danger')
+            return render_template('appointment_form.html', form=form, title='Edit Appointment',
+                                   form_action=url_for('appointments.appointment_edit', id=id))
+
+        # Validate clinic hours
+        error = clinic_hours_error(scheduled_date)
+        if error:
+            flash(hours_message(error, scheduled_date), 'danger')
+            return render_template('appointment_form.html', form=form, title='Edit Appointment',
+                                   form_action=url_for('appointments.appointment_edit', id=id))
+
+        reassign = appt.staff_id is None or form.service.data != appt.service or scheduled_date != appt.scheduled_at
+        if reassign:
+            error = staff_hours_error(form.service.data, scheduled_date)
+            if error:
+                flash(error, 'danger')
+                return render_template('appointment_form.html', form=form, title='Edit Appointment',
+                                       form_action=url_for('appointments.appointment_edit', id=id))
+            staff_id = assign_staff(form.service.data, scheduled_date, exclude_id=appt.id)
+            if staff_id is None:
+                flash(f'No staff are available for {form.service.data} at that time. Please choose another time.', 'danger')
+                return render_template('appointment_form.html', form=form, title='Edit Appointment',
+                                       form_action=url_for('appointments.appointment_edit', id=id))
+            appt.staff_id = staff_id
+
+        appt.pet_id = form.pet_id.data
+        appt.service = form.service.data
+        appt.scheduled_at = scheduled_date
+        appt.notes = form.notes.data
+        appt.payment_method = form.payment_method.data
+        if reassign and confirm_staff(appt) is None:
+            db.session.rollback()
+            flash(f'No staff are available for {form.service.data} at that time. Please choose another time.', 'danger')
+            return render_template('appointment_form.html', form=form, title='Edit Appointment',
+                                   form_action=url_for('appointments.appointment_edit', id=id))
+        db.session.commit()
+        promote_waitlist()  # the old slot may have been freed
+        flash('Appointment updated successfully!', 'success')
+        return redirect(url_for('appointments.appointments_list'))
+
+    return render_template('appointment_form.html', form=form, title='Edit Appointment',
+                           form_action=url_for('appointments.appointment_edit', id=id))
+
+@appointments_bp.route('/appointments/<int:id>/delete', methods=['POST'])
+@query_budget(4 + PROMOTION_QUERIES)
+@login_required
+@csrf.exempt
+def appointment_delete(id):
+    appt = Appointment.query.get_or_404(id)
+    if appt.owner != current_user:
+        abort(403)
+    db.session.delete(appt)
+    db.session.commit()
+    promote_waitlist()
+    flash('Appointment deleted successfully!', 'info')
+    return redirect(url_for('appointments.appointments_list'))
+
+@appointments_bp.route('/waitlist/<int:id>/cancel', methods=['POST'])
+@login_required
+def waitlist_cancel(id):
+    entry = WaitlistEntry.query.get_or_404(id)
+    if entry.owner_id != current_user.id:
+        abort(403)
+    cancel_entry(entry)
+    flash('Removed from the waitlist.', 'info')
+    return redirect(url_for('appointments.appointments_list'))
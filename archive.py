@@ -0,0 +1,91 @@
+"""Hot/cold split for appointments.
+
+Finished appointments (completed, cancelled or paid, and scheduled before
+the cutoff) are moved in batches from ``appointment`` into
+``appointment_archive``. Everyday pages and booking checks only query the
+small hot table; reporting views include the archive when asked for history.
+"""
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, func, insert, literal, or_, select, union_all
+from sqlalchemy.orm import joinedload
+from extensions import db
+from models import Appointment, ArchivedAppointment
+
+FINISHED_STATUSES = ('Completed', 'Cancelled')
+HISTORY_PER_PAGE = 100  # archived rows shown per page; the archive only grows
+SHARED_COLUMNS = [c.key for c in Appointment.__table__.columns]
+
+
+def archivable(cutoff):
+    """Filter for hot appointments that are finished and older than ``cutoff``."""
+    return (Appointment.scheduled_at < cutoff) & or_(
+        Appointment.status.in_(FINISHED_STATUSES),
+        Appointment.payment_status == 'Paid',
+    )
+
+
+def archive_appointments(older_than_days=90, batch_size=1000):
+    """Move finished appointments into the archive, one transaction per batch.
+
+    Returns the number of rows moved.
+    """
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    archived_at = datetime.now()
+    hot = Appointment.__table__
+    moved = 0
+    last_id = 0
+    while True:
+        ids = db.session.execute(
+            select(hot.c.id).where(archivable(cutoff), hot.c.id > last_id)
+            .order_by(hot.c.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        rows = select(*[hot.c[name] for name in SHARED_COLUMNS], literal(archived_at)).where(hot.c.id.in_(ids))
+        db.session.execute(insert(ArchivedAppointment.__table__).from_select(SHARED_COLUMNS + ['archived_at'], rows))
+        db.session.execute(delete(hot).where(hot.c.id.in_(ids)))
+        db.session.commit()
+        moved += len(ids)
+        last_id = ids[-1]
+    return moved
+
+
+def appointments_with_history(include_history=False, page=1):
+    """All hot appointments ordered by time, plus one page of archived ones if asked for.
+
+    Returns ``(appointments, history)``, where ``history`` is the archive's
+    Pagination (most recent first) or None.
+    """
+    appointments = (Appointment.query.options(joinedload(Appointment.pet), joinedload(Appointment.owner))
+                    .order_by(Appointment.scheduled_at).all())
+    history = None
+    if include_history:
+        history = (ArchivedAppointment.query
+                   .options(joinedload(ArchivedAppointment.pet), joinedload(ArchivedAppointment.owner))
+                   .order_by(ArchivedAppointment.scheduled_at.desc(), ArchivedAppointment.id.desc())
+                   .paginate(page=page, per_page=HISTORY_PER_PAGE, error_out=False))
+        appointments += history.items
+        appointments.sort(key=lambda a: a.scheduled_at)
+    return appointments, history
+
+
+def service_counts(include_history=False):
+    """Appointment count per service, from the hot table and optionally the archive."""
+    tables = [Appointment.__table__]
+    if include_history:
+        tables.append(ArchivedAppointment.__table__)
+    rows = union_all(*[select(t.c.service, func.count().label('n')).group_by(t.c.service) for t in tables]).subquery()
+    query = select(rows.c.service, func.sum(rows.c.n)).group_by(rows.c.service)
+    return {service: int(n) for service, n in db.session.execute(query)}
+
+
+@click.command('archive-appointments')
+@click.option('--older-than', default=90, show_default=True, help='Only archive appointments older than this many days.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows moved per transaction.')
+@with_appcontext
+def archive_command(older_than, batch_size):
+    """Move finished appointments into the archive table."""
+    moved = archive_appointments(older_than, batch_size)
+    click.echo(f'Archived {moved} appointments.')
@@ -0,0 +1,97 @@
+"""Buffered, append-only audit log for admin and payment actions.
+
+``audit_log.record()`` only appends to an in-process buffer, so it adds
+almost nothing to request latency. The buffer is written with one
+``executemany`` INSERT when it reaches ``max_batch`` entries, or
+``flush_interval`` seconds after the first pending entry, whichever comes
+first. Pending entries are also flushed at interpreter exit.
+"""
+import atexit
+import json
+import threading
+import time
+from datetime import datetime
+from flask_login import current_user
+from sqlalchemy import insert
+from extensions import db
+from models import AuditEntry
+
+
+def snapshot(obj, exclude=()):
+    """Column values of a model instance, for the before/after fields."""
+    return {c.key: getattr(obj, c.key) for c in obj.__table__.columns if c.key not in exclude}
+
+
+class AuditLog:
+    def __init__(self, max_batch=50, flush_interval=2.0, max_pending=10000):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.app = None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['audit_log'] = self
+        atexit.register(self.flush)
+
+    def record(self, action, target_type, target_id=None, before=None, after=None):
+        """Queue an audit entry; the acting user is taken from the current request."""
+        actor = current_user if current_user and current_user.is_authenticated else None
+        entry = {
+            'created_at': datetime.now(),
+            'actor_id': actor.id if actor else None,
+            'actor_email': actor.email if actor else None,
+            'action': action,
+            'target_type': target_type,
+            'target_id': target_id,
+            'old_values': json.dumps(before, default=str) if before is not None else None,
+            'new_values': json.dumps(after, default=str) if after is not None else None,
+        }
+        with self._lock:
+            self._pending.append(entry)
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self.flush()
+        else:
+            self._ensure_flusher()
+
+    def flush(self):
+        """Write all pending entries in one executemany; returns how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch or self.app is None:
+                return 0
+            try:
+                with self.app.app_context():
+                    with db.engine.begin() as conn:
+                        conn.execute(insert(AuditEntry.__table__), batch)
+            except Exception:
+                # Keep the entries for the next attempt, up to max_pending
+                with self._lock:
+                    self._pending = (batch + self._pending)[-self.max_pending:]
+                self.app.logger.exception('Failed to write %d audit entries', len(batch))
+                return 0
+            return len(batch)
+
+    def _ensure_flusher(self):
+        # Started lazily so the thread belongs to the worker process, not a pre-fork parent
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='audit-flusher', daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+audit_log = AuditLog()
@@ -0,0 +1,148 @@
+from functools import wraps
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, session
+from flask_login import login_user, login_required, logout_user, current_user
+from extensions import db, csrf
+from models import User
+from forms import RegistrationForm
+from otp import send_and_store_otp, verify_otp
+
+auth_bp = Blueprint('auth', __name__)
+
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or current_user.role != 'admin':
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@auth_bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        # AJAX request
+        form = RegistrationForm()
+        if form.validate_on_submit():
+            if User.query.filter_by(email=form.email.data).first():
+                return {'success': False, 'message': 'Email already registered.'}
+            if not form.otp.data:
+                # Send OTP and prompt for verification
+                if send_and_store_otp(0, form.email.data, 'registration'):  # Use 0 as temp user_id
+                    session['pending_registration'] = {
+                        'name': form.name.data,
+                        'email': form.email.data,
+                        'password': form.password.data
+                    }
+                    return {'success': True, 'message': 'OTP sent to your email. Please enter the OTP to complete registration.', 'require_otp': True}
+                else:
+                    return {'success': False, 'message': 'Failed to send OTP.'}
+            else:
+                # Verify OTP
+                if verify_otp(0, form.otp.data, 'registration', form.email.data):
+                    user = User(name=form.name.data, email=form.email.data, password=form.password.data)
+                    db.session.add(user)
+                    db.session.commit()
+                    session.pop('pending_registration', None)
+                    return {'success': True, 'message': 'Registration successful!'}
+                else:
+                    return {'success': False, 'message': 'Invalid or expired OTP.'}
+        else:
+            return {'success': False, 'message': 'Please fill in all fields correctly.'}
+    else:
+        # Regular GET request
+        form = RegistrationForm()
+        if form.validate_on_submit():
+            if User.query.filter_by(email=form.email.data).first():
+                flash('Email already registered.', 'warning')
+                return redirect(url_for('auth.register'))
+            if not form.otp.data:
+                # Send OTP and redirect to verify
+                if send_and_store_otp(0, form.email.data, 'registration'):
+                    session['pending_registration'] = {
+                        'name': form.name.data,
+                        'email': form.email.data,
+                        'password': form.password.data
+                    }
+                    flash('OTP sent to your email. Please verify.', 'info')
+                    return redirect(url_for('auth.verify_otp_page'))
+                else:
+                    flash('Failed to send OTP.', 'danger')
+            else:
+                # Verify OTP
+                if verify_otp(0, form.otp.data, 'registration'):
+                    user = User(name=form.name.data, email=form.email.data, password=form.password.data)
+                    db.session.add(user)
+                    db.session.commit()
+                    session.pop('pending_registration', None)
+                    flash('Registration successful! Please login.', 'success')
+                    return redirect(url_for('auth.login'))
+                else:
+                    flash('Invalid or expired OTP.', 'danger')
+        return render_template('register.html', form=form)
+
+@auth_bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        # AJAX request
+        email = request.form['email'].lower()
+        password = request.form['password']
+
+        if len(password) < 6:
+            return {'success': False, 'message': 'Password length is incorrect. Minimum 6 characters required.'}
+
+        user = User.query.filter_by(email=email).first()
+        if not user:
+            return {'success': False, 'message': 'Email not registered.'}
+
+        if user.password != password:
+            return {'success': False, 'message': 'Password is incorrect.'}
+
+        # Check user role
+        if user.role == 'admin':
+            session.regenerate()
+            login_user(user)
+            return {'success': True, 'redirect': url_for('admin.admin_dashboard')}
+        else:
+            # Send OTP for login verification for regular users
+            if send_and_store_otp(user.id, user.email, 'login'):
+                session['pending_user_id'] = user.id
+                return {'success': True, 'redirect': url_for('auth.verify_otp_page')}
+            else:
+                return {'success': False, 'message': 'Failed to send OTP.'}
+    else:
+        # Regular GET request
+        return render_template('login.html')
+
+@auth_bp.route('/verify_otp', methods=['GET', 'POST'])
+@csrf.exempt
+def verify_otp_page():
+    if request.method == 'POST':
+        otp_code = request.form.get('otp')
+        user_id = session.get('pending_user_id')
+        registration_data = session.get('pending_registration')
+        if user_id and verify_otp(user_id, otp_code, 'login'):
+            user = User.query.get(user_id)
+            session.regenerate()
+            login_user(user)
+            session.pop('pending_user_id', None)
+            flash('Login successful!', 'success')
+            return redirect(url_for('main.index'))
+        elif registration_data and verify_otp(0, otp_code, 'registration', registration_data['email']):
+            user = User(name=registration_data['name'], email=registration_data['email'], password=registration_data['password'])
+            db.session.add(user)
+            db.session.commit()
+            session.pop('pending_registration', None)
+            flash('Registration successful! Please login.', 'success')
+            return redirect(url_for('main.index'))
+        else:
+            flash('Invalid or expired OTP.', 'danger')
+    return render_template('verify_otp.html')
+
+
+@auth_bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('Logged out.', 'info')
+    return redirect(url_for('main.index'))
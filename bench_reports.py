@@ -0,0 +1,66 @@
+"""Benchmark the reports extract on a scratch SQLite database.
+
+Usage: python bench_reports.py [appointments]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert
+from app import create_app
+from config import Config, SERVICES
+from extensions import db
+from models import User, Pet, Appointment
+import reports
+
+
+SCRATCH = tempfile.mkdtemp()
+
+
+class BenchConfig(Config):
+    SQLITE_PATH = os.path.join(SCRATCH, 'bench.db')  # raw db.py helpers too, never instance/
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + SQLITE_PATH
+    SESSION_SQLITE_PATH = os.path.join(SCRATCH, 'sessions.db')
+
+
+def seed(count, years=3):
+    owner = User(name='Bench Owner', email='bench@example.com', password='x')
+    pet = Pet(name='Bench Pet', owner=owner)
+    db.session.add_all([owner, pet])
+    db.session.commit()
+    start = datetime.now() - timedelta(days=365 * years)
+    rows = [{
+        'pet_id': pet.id, 'owner_id': owner.id,
+        'service': random.choice(SERVICES)['title'],
+        'scheduled_at': start + timedelta(minutes=random.randrange(365 * years * 24 * 60)),
+        'payment_method': random.choice(('pay_now', 'pay_on_site')),
+    } for _ in range(count)]
+    db.session.execute(insert(Appointment), rows)
+    db.session.commit()
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f'{label:40}: {(time.perf_counter() - start) * 1000:8.1f} ms')
+    return result
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        seed(count)
+        window = (date.today() - timedelta(days=365 * 3), date.today() + timedelta(days=1))
+        print(f'{count} appointments over 3 years (numpy: {reports.np is not None})')
+        timed('first report (streamed load + aggregate)', lambda: reports.revenue_report(*window, 'month', 'service'))
+        timed('same report (cached)', lambda: reports.revenue_report(*window, 'month', 'service'))
+        timed('weekly by payment method', lambda: reports.revenue_report(*window, 'week', 'payment_method'))
+        timed('daily by service', lambda: reports.revenue_report(*window, 'day', 'service'))
+        db.session.execute(insert(Appointment), [{'pet_id': 1, 'owner_id': 1, 'service': 'Surgery',
+                                                   'scheduled_at': datetime.now(), 'payment_method': 'pay_now'}])
+        db.session.commit()
+        timed('after one new booking (incremental)', lambda: reports.revenue_report(*window, 'month', 'service'))
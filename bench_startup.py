@@ -0,0 +1,42 @@
+"""Benchmark worker startup: time to import the app and serve the first request.
+
+Each run is a fresh interpreter, like a new gunicorn worker.
+
+Usage: python bench_startup.py [runs] [project_dir]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = r'''
+import time
+start = time.perf_counter()
+from app import app
+imported = time.perf_counter()
+app.test_client().get('/staff')
+served = time.perf_counter()
+print(imported - start, served - imported)
+'''
+
+
+# The probe's first request may create tables; keep them out of instance/
+ENV = {**os.environ, 'SQLITE_PATH': os.path.join(tempfile.mkdtemp(), 'bench.db')}
+
+
+def measure(project_dir):
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=project_dir, check=True,
+                         capture_output=True, text=True, env=ENV).stdout.split()
+    return float(out[-2]) * 1000, float(out[-1]) * 1000
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    project_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.dirname(os.path.abspath(__file__))
+    measure(project_dir)  # warm the filesystem and bytecode caches
+    results = [measure(project_dir) for _ in range(runs)]
+    imports = statistics.median(r[0] for r in results)
+    first = statistics.median(r[1] for r in results)
+    print(f'import app:    {imports:8.1f} ms (median of {runs})')
+    print(f'first request: {first:8.1f} ms (median of {runs})')
@@ -0,0 +1,132 @@
+"""Clinic hours and booking-time rules, compiled into lookup tables.
+
+Weekly hours (config.CLINIC_HOURS) and per-date exceptions (holidays,
+closures and changed hours, stored as ScheduleException rows) are compiled
+once into a minute-of-day table per weekday and per exception date. Checking
+a requested time is then a dict lookup and an index, with no parsing; the
+next bookable slots come from a sorted list of slot starts kept per table.
+
+The compiled rules are dropped whenever a ScheduleException changes in this
+process, and rebuilt at least every RULES_TTL seconds to pick up changes made
+by other workers.
+"""
+import bisect
+import threading
+import time as clock
+from datetime import datetime, timedelta, time
+from sqlalchemy import event
+from config import CLINIC_HOURS, CLINIC_CLOSED_NOTES
+from models import ScheduleException
+
+MINUTES_PER_DAY = 24 * 60
+SLOT_MINUTES = 30  # spacing of the suggested slots
+SEARCH_DAYS = 60  # how far ahead next_slots looks
+RULES_TTL = 300  # seconds
+DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+_rules = None
+_lock = threading.Lock()
+
+
+def to_minute(value):
+    """Minute of the day for an 'HH:MM' string or a time/datetime."""
+    if isinstance(value, str):
+        hours, minutes = value.split(':')
+        return int(hours) * 60 + int(minutes)
+    return value.hour * 60 + value.minute
+
+
+def describe(intervals):
+    def label(minute):
+        return time(minute // 60, minute % 60).strftime('%I:%M %p').lstrip('0')
+    return ' and '.join(f'from {label(first)} to {label(last)}' for first, last in intervals)
+
+
+class DayTable:
+    """Bookable start minutes of one day, as a 1440-entry table and a slot list."""
+
+    def __init__(self, intervals, note=None):
+        self.intervals = intervals  # [(first, last)] bookable minutes, inclusive
+        self.note = note
+        self.open = bytearray(MINUTES_PER_DAY)
+        for first, last in intervals:
+            self.open[first:last + 1] = b'\x01' * (last - first + 1)
+        self.slots = [m for m in range(0, MINUTES_PER_DAY, SLOT_MINUTES) if self.open[m]]
+
+
+class BookingRules:
+    def __init__(self, weekly, exceptions):
+        self.weekdays = [DayTable([(to_minute(a), to_minute(b)) for a, b in weekly.get(d, [])],
+                                  CLINIC_CLOSED_NOTES.get(d)) for d in range(7)]
+        self.dates = {}
+        for e in exceptions:
+            intervals = [(to_minute(e.opens), to_minute(e.closes))] if e.opens and e.closes else []
+            self.dates[e.day] = DayTable(intervals, e.reason)
+        self.built_at = clock.monotonic()
+
+    def table(self, day):
+        table = self.dates.get(day)
+        return table if table is not None else self.weekdays[day.weekday()]
+
+    def is_open(self, when):
+        return bool(self.table(when.date()).open[when.hour * 60 + when.minute])
+
+    def error(self, when):
+        """Why ``when`` can't be booked, or None if the clinic takes bookings then."""
+        day = when.date()
+        table = self.table(day)
+        if table.open[when.hour * 60 + when.minute]:
+            return None
+        if day in self.dates:
+            if not table.intervals:
+                reason = f' ({table.note})' if table.note else ''
+                return f'The clinic is closed on {day:%B %d, %Y}{reason}. Please choose another day.'
+            return (f'On {day:%B %d, %Y}, appointments are only available {describe(table.intervals)}. '
+                    'Please choose a valid time.')
+        name = DAY_NAMES[day.weekday()]
+        if not table.intervals:
+            note = f' {table.note}' if table.note else ''
+            return f'Appointments are not available on {name}s{note}. Please choose another day.'
+        return f'On {name}s, appointments are only available {describe(table.intervals)}. Please choose a valid time.'
+
+    def next_slots(self, after, count=3):
+        """The next ``count`` bookable slot starts at or after ``after``."""
+        found = []
+        minute = after.hour * 60 + after.minute
+        for offset in range(SEARCH_DAYS):
+            day = after.date() + timedelta(days=offset)
+            slots = self.table(day).slots
+            start = bisect.bisect_left(slots, minute) if offset == 0 else 0
+            for m in slots[start:start + count - len(found)]:
+                found.append(datetime.combine(day, time(m // 60, m % 60)))
+            if len(found) >= count:
+                break
+        return found
+
+
+def rules():
+    """The compiled rules, rebuilt from config and ScheduleException when stale."""
+    global _rules
+    current = _rules
+    if current is None or clock.monotonic() - current.built_at > RULES_TTL:
+        with _lock:
+            _rules = current = BookingRules(CLINIC_HOURS, ScheduleException.query.all())
+    return current
+
+
+def reload_rules(*args):
+    """Drop the compiled rules; called after the schedule changes."""
+    global _rules
+    _rules = None
+
+
+def clinic_hours_error(when):
+    return rules().error(when)
+
+
+def next_slots(after, count=3):
+    return rules().next_slots(after, count)
+
+
+for event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(ScheduleException, event_name, reload_rules)
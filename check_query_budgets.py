@@ -0,0 +1,158 @@
+"""Request every page on a seeded scratch database and enforce query budgets.
+
+Each GET route is hit as an owner and as an admin with the fragment cache
+cleared, so templates render from scratch. Then the write routes that free
+a slot are hit, each with an entry on the waitlist to promote into it.
+Exits non-zero and prints the captured SQL for any route over its budget
+(see query_budget.py).
+
+Usage: python check_query_budgets.py [rows per owner]
+"""
+import os
+import sys
+import tempfile
+from datetime import date, datetime, time, timedelta
+from app import create_app
+from archive import archive_appointments
+from config import Config, SERVICES
+from extensions import db
+from models import User, Pet, Appointment, WaitlistEntry
+from scheduler import assign_staff
+from waitlist import join_waitlist
+from query_budget import QueryBudgetExceeded
+from template_cache import fragment_cache
+
+SCRATCH = tempfile.mkdtemp()
+
+
+class CheckConfig(Config):
+    SQLITE_PATH = os.path.join(SCRATCH, 'check.db')  # raw db.py helpers too, never instance/
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + SQLITE_PATH
+    SESSION_SQLITE_PATH = os.path.join(SCRATCH, 'sessions.db')
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    QUERY_BUDGET_ENFORCE = True
+
+
+def seed(rows):
+    """Two owners with ``rows`` pets and appointments each, plus as many archived."""
+    owners = [User(name=f'Owner {i}', email=f'owner{i}@example.com', password='secret') for i in range(2)]
+    start = datetime.now() + timedelta(days=1)
+    past = datetime.now() - timedelta(days=1)
+    pets = []
+    for owner in owners:
+        for i in range(rows):
+            pet = Pet(name=f'Pet {i}', owner=owner)
+            pet.add_medical_record(f'Visit {i}', owner)
+            pets.append(pet)
+            db.session.add(Appointment(pet=pet, owner=owner, service=SERVICES[i % len(SERVICES)]['title'],
+                                       scheduled_at=past - timedelta(hours=i), status='Completed',
+                                       payment_method='pay_now'))
+    db.session.add_all(owners)
+    db.session.commit()
+    archive_appointments(older_than_days=0)
+    for i, pet in enumerate(pets):
+        db.session.add(Appointment(pet=pet, owner=pet.owner, service=SERVICES[i % len(SERVICES)]['title'],
+                                   scheduled_at=start + timedelta(hours=i % rows), status='Scheduled',
+                                   payment_method='pay_now'))
+    db.session.commit()
+    return owners[0]
+
+
+def pages(owner):
+    pet = owner.pets[0]
+    appointment = owner.appointments[0]
+    user_pages = ['/', '/services', '/staff', '/dashboard', '/pets', '/pets/new', f'/pets/{pet.id}/edit',
+                  f'/pets/{pet.id}/history', '/appointments', '/appointments/new',
+                  f'/appointments/{appointment.id}/edit', f'/payment/{appointment.id}/560.0',
+                  '/payments/status?ids=' + ','.join(str(a.id) for a in owner.appointments)]
+    admin_pages = ['/admin/dashboard', '/admin/dashboard?history=1', '/admin/users', f'/admin/users/{owner.id}/edit',
+                   '/admin/pets', '/admin/appointments', '/admin/appointments?history=1', '/admin/board',
+                   '/admin/reports', '/admin/audit', '/admin/hours']
+    return user_pages, admin_pages
+
+
+def write_requests(owner):
+    """POST (and GET) routes that free a slot, with people waiting for that day and service."""
+    day = date.today() + timedelta(days=2)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    service = 'Grooming'
+
+    def booking(hour, pet):
+        start = datetime.combine(day, time(hour))
+        appointment = Appointment(pet=pet, owner=pet.owner, service=service, scheduled_at=start,
+                                  staff_id=assign_staff(service, start), status='Pending Payment',
+                                  payment_status='Pending', payment_method='pay_now')
+        db.session.add(appointment)
+        db.session.commit()
+        return appointment
+
+    other = User(name='Leaving Owner', email='leaving@example.com', password='secret')
+    pets = [Pet(name=f'Write Pet {i}', owner=owner) for i in range(3)] + [Pet(name='Other Pet', owner=other)]
+    db.session.add_all(pets)
+    db.session.commit()
+    moved, deleted, cancelled, paid, admin_deleted = [booking(hour, pets[0]) for hour in (9, 10, 11, 13, 14)]
+    booking(15, pets[1])
+    booking(16, pets[2])
+    booking(8, pets[3])
+    for i in range(8):
+        join_waitlist(owner.pets[0].id, owner.id, service, datetime.combine(day, time(9)), urgency=i % 3)
+
+    user_requests = [
+        ('POST', f'/appointments/{moved.id}/edit', {
+            'pet_id': pets[0].id, 'service': service, 'payment_method': 'pay_now',
+            'scheduled_at': datetime.combine(day + timedelta(days=1), time(9)).strftime('%Y-%m-%dT%H:%M')}),
+        ('POST', f'/appointments/{deleted.id}/delete', None),
+        ('GET', f'/cancel_payment/{cancelled.id}', None),
+        ('POST', f'/confirm_payment/{paid.id}', {'idempotency_key': 'check', 'reference_number': 'CHECK'}),
+        ('POST', f'/pets/{pets[1].id}/delete', None),
+    ]
+    admin_requests = [
+        ('POST', f'/admin/appointments/{admin_deleted.id}/delete', None),
+        ('POST', f'/admin/pets/{pets[2].id}/delete', None),
+        ('POST', f'/admin/users/{other.id}/delete', None),
+    ]
+    return user_requests, admin_requests
+
+
+def check(client, user_id, requests):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    failures = 0
+    for request in requests:
+        method, path, data = request if isinstance(request, tuple) else ('GET', request, None)
+        fragment_cache.clear()
+        try:
+            response = client.open(path, method=method, data=data)
+            print(f'  ok   {response.status_code} {method} {path}')
+        except QueryBudgetExceeded as error:
+            failures += 1
+            print(f'  FAIL {method} {path}\n{error}')
+    return failures
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    app = create_app(CheckConfig)
+    client = app.test_client()
+    client.get('/')  # creates the tables and the admin user
+    with app.app_context():
+        owner = seed(rows)
+        admin_id = User.query.filter_by(role='admin').first().id
+        user_pages, admin_pages = pages(owner)
+        user_writes, admin_writes = write_requests(owner)
+        owner_id = owner.id
+    print(f'Owner pages ({rows} pets and appointments):')
+    failures = check(client, owner_id, user_pages)
+    print('Admin pages:')
+    failures += check(client, admin_id, admin_pages)
+    print('Owner write routes:')
+    failures += check(client, owner_id, user_writes)
+    print('Admin write routes:')
+    failures += check(client, admin_id, admin_writes)
+    with app.app_context():
+        promoted = WaitlistEntry.query.filter_by(status='Promoted').count()
+    print(f'{promoted} waitlist entries promoted.')
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,26 @@
+"""Flask CLI commands, imported only when one is run or listed.
+
+The command modules pull in the importer, archive and form code that a web
+worker never needs, so app.cli resolves them by name instead of importing
+them in create_app().
+"""
+from flask.cli import AppGroup
+from werkzeug.utils import import_string
+
+COMMANDS = {
+    'archive-appointments': 'archive.archive_command',
+    'import-records': 'importer.import_command',
+}
+
+
+class LazyCommandGroup(AppGroup):
+    """``app.cli`` that imports the commands in COMMANDS on first use."""
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(COMMANDS))
+
+    def get_command(self, ctx, name):
+        command = super().get_command(ctx, name)
+        if command is None and name in COMMANDS:
+            command = import_string(COMMANDS[name])
+        return command
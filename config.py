@@ -1,4 +1,46 @@
 # Configuration file for Happy Paws Vet Clinic
+import os
+from dotenv import load_dotenv
+
+# Load environment variables once, before anything reads them
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Config:
+    SECRET_KEY = os.getenv('FLASK_SECRET', 'dev-secret-key')
+
+    # 'mysql' (default) or 'sqlite' for single-node deployments. The raw db.py
+    # helpers always use SQLITE_PATH; in sqlite mode the ORM shares that file.
+    DATABASE_BACKEND = os.getenv('DATABASE_BACKEND', 'mysql')
+    SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join(BASE_DIR, 'instance', 'vetclinic.db'))
+    if DATABASE_BACKEND == 'sqlite':
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + SQLITE_PATH
+    else:
+        SQLALCHEMY_DATABASE_URI = f'mysql+pymysql://{os.getenv("DB_USER")}:{os.getenv("DB_PASSWORD")}@{os.getenv("DB_HOST")}:{os.getenv("DB_PORT")}/{os.getenv("DB_NAME")}'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Server-side sessions: the cookie only carries a session id
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'sqlite')
+    SESSION_REDIS_URL = os.getenv('SESSION_REDIS_URL')
+
+    # Query budgets per request (see query_budget.py); views may also use @query_budget(n)
+    QUERY_BUDGET_DEFAULT = 10
+    QUERY_BUDGETS = {}  # endpoint -> max queries
+    QUERY_BUDGET_ENFORCE = os.getenv('QUERY_BUDGET_ENFORCE') == '1'
+
+    # Pet photo uploads
+    MAX_CONTENT_LENGTH = 10 * 1024 * 1024
+    PHOTO_UPLOAD_DIR = os.getenv('PHOTO_UPLOAD_DIR')  # defaults to instance/uploads/pets
+    PHOTO_WORKERS = int(os.getenv('PHOTO_WORKERS', 2))
+
+    # Email (OTP delivery)
+    EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
+    EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
+    EMAIL_USER = os.getenv('EMAIL_USER')
+    EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
+
 
 # Services offered by the clinic
 SERVICES = [
@@ -37,43 +79,70 @@ SERVICES = [
 # Staff members
 STAFF = [
     {
-        'name': 'Jan Paul E. De Quiroz', 'role': 'Senior Veterinarian', 'bio': 'Expert in animal health and wellness with years of dedicated service.'
+        'name': 'Jan Paul E. De Quiroz', 'role': 'Senior Veterinarian', 'bio': 'Expert in animal health and wellness with years of dedicated service.',
+        'services': ['Wellness Checkup', 'Vaccination', 'Surgery', 'Deworming']
     },
 
     {
-        'name': 'Danniel John Morales', 'role': 'Veterinarian', 'bio': 'Specializes in surgery and compassionate pet care.'
+        'name': 'Danniel John Morales', 'role': 'Veterinarian', 'bio': 'Specializes in surgery and compassionate pet care.',
+        'services': ['Surgery', 'Wellness Checkup']
     },
 
     {
-        'name': 'Zuriel Pecadero', 'role': 'Help Desk', 'bio': 'Helps you with your inquiries.'
+        'name': 'Zuriel Pecadero', 'role': 'Help Desk', 'bio': 'Helps you with your inquiries.',
+        'services': []
     },
 
     {
-        'name': 'Kim Tomotorgo', 'role': 'Wellness Veterinarian', 'bio': 'Focused on Wellness Checkups and ensuring pets maintain optimal health.'
+        'name': 'Kim Tomotorgo', 'role': 'Wellness Veterinarian', 'bio': 'Focused on Wellness Checkups and ensuring pets maintain optimal health.',
+        'services': ['Wellness Checkup']
 
     },
 
     {
-        'name': 'Vanessa Ofrancia', 'role': 'Veterinary Nurse', 'bio': 'Specializes in Vaccination and preventive care to keep pets safe from diseases.'
+        'name': 'Vanessa Ofrancia', 'role': 'Veterinary Nurse', 'bio': 'Specializes in Vaccination and preventive care to keep pets safe from diseases.',
+        'services': ['Vaccination']
     },
 
     {
-        'name': 'Irish Rocha', 'role': 'Veterinary Surgical Nurse', 'bio': 'Assists in Surgery and post-operative care with precision and compassion.'
+        'name': 'Irish Rocha', 'role': 'Veterinary Surgical Nurse', 'bio': 'Assists in Surgery and post-operative care with precision and compassion.',
+        'services': ['Surgery']
     },
 
     {
-        'name': 'Ellemar Pundavela', 'role': 'Preventive Care Specialist', 'bio': 'Specializes in Deworming and preventive pet treatments.'
+        'name': 'Ellemar Pundavela', 'role': 'Preventive Care Specialist', 'bio': 'Specializes in Deworming and preventive pet treatments.',
+        'services': ['Deworming']
     },
 
     {
-        'name': 'Ruffaina Hamsain', 'role': 'Dental Care Specialist', 'bio': 'Expert in Dental Cleaning and oral care for pets.'
+        'name': 'Ruffaina Hamsain', 'role': 'Dental Care Specialist', 'bio': 'Expert in Dental Cleaning and oral care for pets.',
+        'services': ['Dental Cleaning']
     },
 
     {
-        'name': 'Rose Ann Tolentino', 'role': 'Grooming Specialist', 'bio': 'Specializes in Grooming and maintaining pet hygiene.'
+        'name': 'Rose Ann Tolentino', 'role': 'Grooming Specialist', 'bio': 'Specializes in Grooming and maintaining pet hygiene.',
+        'services': ['Grooming']
     }
 ]
 
+# Clinic hours per weekday (0=Monday): first and last bookable start time,
+# inclusive. Days not listed are closed. Holidays, closures and changed hours
+# for single dates are ScheduleException rows (Admin > Clinic Hours).
+CLINIC_HOURS = {
+    0: [('08:00', '17:59')],
+    1: [('08:00', '17:59')],
+    2: [('08:00', '17:59')],
+    3: [('08:00', '17:59')],
+    4: [('08:00', '17:59')],
+    5: [('09:00', '16:00')],
+}
+CLINIC_CLOSED_NOTES = {6: 'as it is for emergency only'}
+
+# Staff working hours used when seeding the staff table (Mon-Sat, 0=Monday)
+STAFF_WORK_DAYS = '012345'
+STAFF_WORK_START = '08:00'
+STAFF_WORK_END = '18:00'
+
 # Service prices mapping for quick lookup (numeric values for calculations)
 service_prices = {
     'Wellness Checkup': 500.0,
@@ -83,3 +152,16 @@ service_prices = {
     'Dental Cleaning': 1200.0,
     'Grooming': 600.0
 }
+
+# Expected service durations in minutes, used for staff load balancing
+service_durations = {
+    'Wellness Checkup': 30,
+    'Vaccination': 20,
+    'Surgery': 120,
+    'Deworming': 20,
+    'Dental Cleaning': 60,
+    'Grooming': 60
+}
+
+# Waitlist urgency levels; higher values are promoted first
+WAITLIST_URGENCY = [(0, 'Routine'), (1, 'Soon'), (2, 'Urgent')]
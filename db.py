@@ -1,58 +1,89 @@
 import os
 import sqlite3
-from dotenv import load_dotenv
+import threading
+from flask import current_app, has_app_context
+from config import Config
+
+# Called with each SQL string before it runs (query_budget.py counts them)
+query_hooks = []
+
+# Applied to every SQLite connection, raw or ORM (see apply_pragmas)
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",      # readers don't block the writer
+    "PRAGMA synchronous=NORMAL",    # safe with WAL, far fewer fsyncs
+    "PRAGMA busy_timeout=5000",     # wait for a lock instead of failing
+    "PRAGMA mmap_size=268435456",   # read up to 256 MB straight from the page cache
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+
+_local = threading.local()
+
+
+def apply_pragmas(conn):
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+
+
+def database_path():
+    """SQLITE_PATH of the current app, or of Config outside an app context."""
+    if has_app_context():
+        return current_app.config.get('SQLITE_PATH', Config.SQLITE_PATH)
+    return Config.SQLITE_PATH
 
-# Load environment variables
-load_dotenv()
 
 # DATABASE CONNECTION
 def get_db():
-    try:
-        db_path = os.path.join(os.path.dirname(__file__), 'instance', 'vetclinic.db')
-        conn = sqlite3.connect(db_path)
+    """This thread's connection to the app's SQLITE_PATH, opened on first use."""
+    # A forked worker must not reuse its parent's connections
+    if getattr(_local, 'pid', None) != os.getpid():
+        _local.conns = {}
+        _local.pid = os.getpid()
+    path = database_path()
+    conn = _local.conns.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5)
         conn.row_factory = sqlite3.Row  # Enable column access by name
-        return conn
-    except sqlite3.Error as err:
-        raise
+        apply_pragmas(conn)
+        _local.conns[path] = conn
+    return conn
 
 
 # DATABASE HELPERS
 def query_all(query, params=()):
     conn = get_db()
+    for hook in query_hooks:
+        hook(query)
+    cur = conn.execute(query, params)
     try:
-        cur = conn.cursor()
-        cur.execute(query, params)
-        data = cur.fetchall()
-        return data
+        return cur.fetchall()
     finally:
         cur.close()
-        conn.close()
 
 
 def query_one(query, params=()):
     conn = get_db()
+    for hook in query_hooks:
+        hook(query)
+    cur = conn.execute(query, params)
     try:
-        cur = conn.cursor()
-        cur.execute(query, params)
-        row = cur.fetchone()
-        return row
+        return cur.fetchone()
     finally:
         cur.close()
-        conn.close()
 
 
 def execute(query, params=()):
     """Execute a write query and return lastrowid (if available)."""
     conn = get_db()
+    for hook in query_hooks:
+        hook(query)
     try:
-        cur = conn.cursor()
-        cur.execute(query, params)
+        cur = conn.execute(query, params)
         conn.commit()
-        lastrowid = getattr(cur, 'lastrowid', None)
-        return lastrowid
-    except Exception as e:
+    except Exception:
         conn.rollback()
         raise
-    finally:
-        cur.close()
-        conn.close()
+    lastrowid = cur.lastrowid
+    cur.close()
+    return lastrowid
@@ -0,0 +1,9 @@
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import LoginManager
+from flask_wtf import CSRFProtect
+
+# Created unbound; create_app() attaches them to the application
+db = SQLAlchemy()
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+csrf = CSRFProtect()
@@ -0,0 +1,62 @@
+from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileAllowed
+from wtforms import StringField, PasswordField, SubmitField, IntegerField, TextAreaField, SelectField, DateTimeField, RadioField, DateField, TimeField
+from wtforms.validators import DataRequired, Length, Email, EqualTo, Optional, ValidationError
+from config import SERVICES, WAITLIST_URGENCY
+from photos import ALLOWED_EXTENSIONS, is_image
+
+
+# ------------------- FORMS -------------------
+class RegistrationForm(FlaskForm):
+    name = StringField('Full Name', validators=[DataRequired(), Length(2, 80)])
+    email = StringField('Email', validators=[DataRequired(), Email()])
+    password = PasswordField('Password', validators=[DataRequired(), Length(6, 128)])
+    password2 = PasswordField('Confirm Password', validators=[DataRequired(), EqualTo('password')])
+    otp = StringField('OTP Code', validators=[Optional(), Length(6, 6)])
+    submit = SubmitField('Register')
+
+class LoginForm(FlaskForm):
+    email = StringField('Email', validators=[DataRequired(), Email()])
+    password = PasswordField('Password', validators=[DataRequired()])
+    submit = SubmitField('Login')
+
+class PetForm(FlaskForm):
+    name = StringField('Name', validators=[DataRequired()])
+    breed = StringField('Breed', validators=[Optional()])
+    age = IntegerField('Age', validators=[Optional()])
+    medical_entry = TextAreaField('Add Medical Note', validators=[Optional()])
+    photo_file = FileField('Photo', validators=[Optional(), FileAllowed(ALLOWED_EXTENSIONS, 'Images only.')])
+    submit = SubmitField('Save')
+
+    def validate_photo_file(self, field):
+        if field.data and not is_image(field.data.stream):
+            raise ValidationError('This file is not a readable image.')
+
+class AppointmentForm(FlaskForm):
+    pet_id = SelectField('Pet', coerce=int, validators=[DataRequired()])
+    service = SelectField('Service', choices=[(s['title'], s['title']) for s in SERVICES])
+    scheduled_at = DateTimeField('When', format='%Y-%m-%dT%H:%M', validators=[DataRequired()])
+    notes = TextAreaField('Notes', validators=[Optional()])
+    payment_method = RadioField('Payment Method', choices=[('pay_on_site', 'Pay on the Vet (On-site)'), ('pay_now', 'Pay Now (GCash)')], default='pay_now', validators=[DataRequired()])
+    urgency = SelectField('Urgency', coerce=int, choices=WAITLIST_URGENCY, default=0)
+    submit = SubmitField('Save')
+    join_waitlist = SubmitField('Join Waitlist')
+
+class ScheduleExceptionForm(FlaskForm):
+    day = DateField('Date', validators=[DataRequired()])
+    opens = TimeField('First Booking', validators=[Optional()])
+    closes = TimeField('Last Booking', validators=[Optional()])
+    reason = StringField('Reason', validators=[Optional(), Length(max=120)])
+    submit = SubmitField('Save')
+
+    def validate(self, extra_validators=None):
+        # Checked here because Optional() stops the per-field chain on empty times
+        if not super().validate(extra_validators):
+            return False
+        if (self.opens.data is None) != (self.closes.data is None):
+            self.closes.errors.append('Give both times for changed hours, or neither to close all day.')
+            return False
+        if self.opens.data and self.closes.data < self.opens.data:
+            self.closes.errors.append('Last booking must be after the first.')
+            return False
+        return True
@@ -0,0 +1,248 @@
+"""Streaming bulk import of owners, pets and past appointments.
+
+    flask import-records owners.csv --kind owners
+    flask import-records pets.jsonl --kind pets
+    flask import-records appointments.csv --kind appointments
+
+Input is CSV with a header row or JSON Lines, read one row at a time so
+memory stays flat whatever the file size. Rows are validated with the same
+form rules as the web pages (and clinic hours for appointments), then each
+batch is written with one bulk INSERT per table in a single transaction.
+
+After every committed batch the row number is saved to ``<input>.checkpoint``
+and a rerun resumes after it. Rows that fail validation, or that already
+exist (same email, same pet name for an owner, same pet/service/time, even
+if archived), are appended to ``<input>.rejected.jsonl`` with their errors,
+so reruns are safe.
+
+Owners, pets and appointments refer to each other by owner email and pet
+name, so import the three files in that order.
+"""
+import csv
+import json
+import os
+import secrets
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from flask_wtf import FlaskForm
+from sqlalchemy import insert, select, tuple_, union_all
+from werkzeug.datastructures import MultiDict
+from booking_rules import clinic_hours_error
+from extensions import db
+from forms import AppointmentForm, PetForm, RegistrationForm
+from models import Appointment, ArchivedAppointment, MedicalRecord, Pet, User, summarize
+
+BATCH_SIZE = 5000
+
+
+class OwnerImportForm(FlaskForm):
+    name = RegistrationForm.name
+    email = RegistrationForm.email
+
+
+def read_rows(path):
+    """Yield (row number, dict) from a CSV or JSON Lines file."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.json')):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for number, row in enumerate(rows, 1):
+            yield number, {k: ('' if v is None else str(v).strip()) for k, v in row.items()}
+
+
+def validate(form_class, row, **choices):
+    form = form_class(formdata=MultiDict(row), meta={'csrf': False})
+    for field, values in choices.items():
+        form[field].choices = values
+    if form.validate():
+        return form, None
+    return None, {field: errors for field, errors in form.errors.items()}
+
+
+# ------------------- IMPORTERS -------------------
+# Each takes a list of (row number, row) and returns (inserted, rejected),
+# where rejected is a list of (row number, row, errors). One query per batch
+# resolves references and duplicates; nothing is queried per row.
+
+def import_owners(batch):
+    emails = {row.get('email', '').lower() for _, row in batch}
+    taken = set(db.session.execute(select(User.email).where(User.email.in_(emails))).scalars())
+    taken = {email.lower() for email in taken}
+    users, rejected = [], []
+    for number, row in batch:
+        form, errors = validate(OwnerImportForm, row)
+        if errors is None and form.email.data.lower() in taken:
+            errors = {'email': ['Already registered.']}
+        if errors:
+            rejected.append((number, row, errors))
+            continue
+        taken.add(form.email.data.lower())
+        # Owners without a password get a random one; an admin can set a real one later
+        password = row.get('password') or secrets.token_urlsafe(16)
+        users.append({'name': form.name.data, 'email': form.email.data, 'password': password, 'role': 'user'})
+    if users:
+        db.session.execute(insert(User), users)
+    return len(users), rejected
+
+
+def import_pets(batch):
+    emails = {row.get('owner_email', '').lower() for _, row in batch}
+    owners = {email.lower(): owner_id for owner_id, email in
+              db.session.execute(select(User.id, User.email).where(User.email.in_(emails)))}
+    existing = set(db.session.execute(
+        select(Pet.owner_id, Pet.name).where(Pet.owner_id.in_(owners.values()))).tuples())
+    now = datetime.now()
+    pets, histories, rejected = [], {}, []
+    for number, row in batch:
+        owner_id = owners.get(row.get('owner_email', '').lower())
+        form, errors = validate(PetForm, {**row, 'medical_entry': row.get('medical_history', '')})
+        if errors is None and owner_id is None:
+            errors = {'owner_email': ['No owner with this email.']}
+        if errors is None and (owner_id, form.name.data) in existing:
+            errors = {'name': ['This owner already has a pet with this name.']}
+        if errors:
+            rejected.append((number, row, errors))
+            continue
+        existing.add((owner_id, form.name.data))
+        entry = (form.medical_entry.data or '').strip()
+        pets.append({'owner_id': owner_id, 'name': form.name.data, 'breed': form.breed.data or None,
+                     'age': form.age.data, 'medical_summary': summarize(entry) if entry else None,
+                     'medical_updated_at': now if entry else None})
+        if entry:
+            histories[(owner_id, form.name.data)] = entry
+    if pets:
+        db.session.execute(insert(Pet), pets)
+    if histories:
+        # MySQL has no RETURNING, so look the new ids up by (owner, name)
+        ids = db.session.execute(select(Pet.id, Pet.owner_id, Pet.name).where(
+            tuple_(Pet.owner_id, Pet.name).in_(list(histories)))).all()
+        db.session.execute(insert(MedicalRecord), [
+            {'pet_id': pet_id, 'created_at': now, 'author_name': 'Imported', 'entry': histories[(owner_id, name)]}
+            for pet_id, owner_id, name in ids])
+    return len(pets), rejected
+
+
+def import_appointments(batch):
+    keys = {(row.get('owner_email', '').lower(), row.get('pet_name', '')) for _, row in batch}
+    pets = {}
+    for pet_id, owner_id, email, name in db.session.execute(
+            select(Pet.id, Pet.owner_id, User.email, Pet.name).join(User, Pet.owner_id == User.id)
+            .where(User.email.in_({email for email, _ in keys}))):
+        key = (email.lower(), name)
+        if key in keys:
+            # Two pets with the same name under one owner can't be told apart
+            pets[key] = None if key in pets else (pet_id, owner_id)
+    pet_ids = [p[0] for p in pets.values() if p]
+    # Archived rows count too, or re-running an old file would book them again
+    existing = set(db.session.execute(union_all(*[
+        select(t.pet_id, t.service, t.scheduled_at).where(t.pet_id.in_(pet_ids))
+        for t in (Appointment, ArchivedAppointment)])).tuples())
+    appointments, rejected = [], []
+    for number, row in batch:
+        key = (row.get('owner_email', '').lower(), row.get('pet_name', ''))
+        pet = pets.get(key)
+        # The form expects the HTML datetime-local format
+        when = row.get('scheduled_at', '').replace(' ', 'T')[:16]
+        fields = {**row, 'scheduled_at': when, 'pet_id': pet[0] if pet else ''}
+        form, errors = validate(AppointmentForm, fields, pet_id=[(pet[0], key[1])] if pet else [])
+        if pet is None:
+            reason = 'Pet name is ambiguous for this owner.' if key in pets else 'No such pet for this owner.'
+            errors = {**(errors or {}), 'pet_name': [reason]}
+        elif errors is None:
+            hours_error = clinic_hours_error(form.scheduled_at.data)
+            if hours_error:
+                errors = {'scheduled_at': [hours_error]}
+            elif (pet[0], form.service.data, form.scheduled_at.data) in existing:
+                errors = {'scheduled_at': ['Already imported.']}
+        if errors:
+            rejected.append((number, row, errors))
+            continue
+        existing.add((pet[0], form.service.data, form.scheduled_at.data))
+        appointments.append({
+            'pet_id': pet[0], 'owner_id': pet[1], 'service': form.service.data,
+            'scheduled_at': form.scheduled_at.data, 'notes': form.notes.data or None,
+            'payment_method': form.payment_method.data,
+            'status': row.get('status') or 'Scheduled',
+            'payment_status': row.get('payment_status') or 'Pending',
+            'reference_number': row.get('reference_number') or None,
+        })
+    if appointments:
+        db.session.execute(insert(Appointment), appointments)
+    return len(appointments), rejected
+
+
+IMPORTERS = {'owners': import_owners, 'pets': import_pets, 'appointments': import_appointments}
+
+
+# ------------------- RUNNER -------------------
+def load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'row': 0, 'inserted': 0, 'rejected': 0}
+
+
+def save_checkpoint(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def import_records(path, kind, batch_size=BATCH_SIZE, restart=False, progress=None):
+    """Import ``path`` as ``kind`` records; returns the final checkpoint state."""
+    importer = IMPORTERS[kind]
+    checkpoint_path = path + '.checkpoint'
+    rejected_path = path + '.rejected.jsonl'
+    if restart:
+        for stale in (checkpoint_path, rejected_path):
+            if os.path.exists(stale):
+                os.remove(stale)
+    state = load_checkpoint(checkpoint_path)
+
+    def run(batch, rejects):
+        try:
+            inserted, rejected = importer(batch)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        for number, row, errors in rejected:
+            rejects.write(json.dumps({'row': number, 'errors': errors, 'data': row}) + '\n')
+        rejects.flush()
+        state['row'] = batch[-1][0]
+        state['inserted'] += inserted
+        state['rejected'] += len(rejected)
+        save_checkpoint(checkpoint_path, state)
+        if progress:
+            progress(state)
+
+    with open(rejected_path, 'a', encoding='utf-8') as rejects:
+        batch = []
+        for number, row in read_rows(path):
+            if number <= state['row']:
+                continue
+            batch.append((number, row))
+            if len(batch) >= batch_size:
+                run(batch, rejects)
+                batch = []
+        if batch:
+            run(batch, rejects)
+    return state
+
+
+@click.command('import-records')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--kind', type=click.Choice(list(IMPORTERS)), required=True, help='What the file contains.')
+@click.option('--batch-size', default=BATCH_SIZE, show_default=True, help='Rows written per transaction.')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and start from the first row.')
+@with_appcontext
+def import_command(path, kind, batch_size, restart):
+    """Bulk import owners, pets or appointments from CSV or JSON Lines."""
+    report = lambda s: click.echo(f"row {s['row']}: {s['inserted']} imported, {s['rejected']} rejected")
+    state = import_records(path, kind, batch_size, restart, progress=report)
+    click.echo(f"Done. {state['inserted']} {kind} imported, {state['rejected']} rejected "
+               f"(see {path}.rejected.jsonl).")
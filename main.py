@@ -0,0 +1,51 @@
+from flask import Blueprint, render_template
+from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+from config import SERVICES, STAFF, service_prices
+from models import Appointment
+from query_budget import query_budget
+
+main_bp = Blueprint('main', __name__)
+
+
+@main_bp.route('/')
+def index():
+    return render_template('index.html', services=SERVICES, staff=STAFF)
+
+@main_bp.route('/services')
+def services():
+    return render_template('services.html', services=SERVICES)
+
+@main_bp.route('/staff')
+def staff():
+    return render_template('staff.html', staff=STAFF)
+
+@main_bp.route('/dashboard')
+@query_budget(4)
+@login_required
+def dashboard():
+    # fetch user's appointments (with their pets, shown by name) and pets
+    appointments = (Appointment.query.options(joinedload(Appointment.pet))
+                    .filter_by(owner_id=current_user.id).order_by(Appointment.scheduled_at).all())
+    pets = current_user.pets
+
+    # Attach a numeric price to each appointment object for use in the template
+    for a in appointments:
+        # default to 0.0 if service not found
+        a.price = float(service_prices.get(a.service, 0.0))
+
+    # Compute subtotal, VAT and total (rounded to 2 decimals)
+    subtotal = sum(a.price for a in appointments)
+    vat = round(subtotal * 0.12, 2)
+    total_payable = round(subtotal + vat, 2)
+    subtotal = round(subtotal, 2)
+
+    return render_template(
+        'dashboard.html',
+        pets=pets,
+        appointments=appointments,
+        subtotal=subtotal,
+        vat=vat,
+        total_payable=total_payable,
+        title='Dashboard'
+    )
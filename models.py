@@ -0,0 +1,248 @@
+from datetime import datetime
+from flask_login import UserMixin
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from extensions import db, login_manager
+from photos import delete_photo
+from template_cache import fragment_cache
+
+
+# ------------------- MODELS -------------------
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    name = db.Column(db.String(80), nullable=False)
+    password = db.Column(db.String(128), nullable=False)
+    role = db.Column(db.String(20), default='user')  # 'user' or 'admin'
+    pets = db.relationship('Pet', backref='owner', lazy=True, cascade="all, delete-orphan")
+    appointments = db.relationship('Appointment', backref='owner', lazy=True, cascade="all, delete-orphan")
+
+
+class Pet(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)
+    breed = db.Column(db.String(80))
+    age = db.Column(db.Integer)
+    medical_summary = db.Column(db.String(255))  # start of the latest MedicalRecord entry
+    medical_updated_at = db.Column(db.DateTime)
+    photo = db.Column(db.String(32))  # token of the files written by photos.py
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    appointments = db.relationship('Appointment', backref='pet', lazy=True, cascade="all, delete-orphan")
+    medical_records = db.relationship('MedicalRecord', backref='pet', lazy='dynamic', cascade="all, delete-orphan",
+                                      order_by='MedicalRecord.created_at.desc()')
+
+    def add_medical_record(self, entry, author=None):
+        """Append a history entry and refresh the denormalized summary."""
+        record = MedicalRecord(entry=entry, created_at=datetime.now(), author_id=author.id if author else None,
+                               author_name=author.name if author else None)
+        self.medical_records.append(record)
+        self.medical_summary = summarize(entry)
+        self.medical_updated_at = record.created_at
+        return record
+
+
+class MedicalRecord(db.Model):
+    """One append-only medical history entry for a pet.
+
+    ``entry`` is deferred, so listing records never pulls the full text
+    unless it is asked for (``undefer(MedicalRecord.entry)``).
+    """
+    __tablename__ = 'medical_record'
+    __table_args__ = (db.Index('ix_medical_record_pet_created', 'pet_id', 'created_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    pet_id = db.Column(db.Integer, db.ForeignKey('pet.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'))
+    author_name = db.Column(db.String(80))
+    entry = db.deferred(db.Column(db.Text, nullable=False))
+
+
+def summarize(entry, length=255):
+    entry = ' '.join(entry.split())
+    return entry if len(entry) <= length else entry[:length - 3].rstrip() + '...'
+
+
+class Appointment(db.Model):
+    # AUTOINCREMENT so SQLite never hands out the id of an archived row again
+    __table_args__ = {'sqlite_autoincrement': True}
+    is_archived = False
+
+    id = db.Column(db.Integer, primary_key=True)
+    pet_id = db.Column(db.Integer, db.ForeignKey('pet.id', ondelete='CASCADE'), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    service = db.Column(db.String(120), nullable=False)
+    scheduled_at = db.Column(db.DateTime, nullable=False, index=True)
+    notes = db.Column(db.Text)
+    status = db.Column(db.String(30), default='Scheduled')
+    payment_method = db.Column(db.String(50))
+    payment_status = db.Column(db.String(50), default='Pending')
+    reference_number = db.Column(db.String(255))
+    staff_id = db.Column(db.Integer, db.ForeignKey('staff.id', ondelete='SET NULL'), index=True)
+    staff = db.relationship('StaffMember')
+
+
+class IdempotencyKey(db.Model):
+    """A payment confirmation already processed, so a repeated submit isn't applied twice."""
+    __tablename__ = 'idempotency_key'
+
+    owner_id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(64), primary_key=True)
+    appointment_id = db.Column(db.Integer, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now, index=True)  # for pruning
+
+
+class ArchivedAppointment(db.Model):
+    """Finished appointments moved out of the hot table by archive.py.
+
+    Same columns as Appointment (ids are kept) plus the time of archival.
+    """
+    __tablename__ = 'appointment_archive'
+    is_archived = True
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    pet_id = db.Column(db.Integer, db.ForeignKey('pet.id', ondelete='CASCADE'), nullable=False, index=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    service = db.Column(db.String(120), nullable=False)
+    scheduled_at = db.Column(db.DateTime, nullable=False, index=True)
+    notes = db.Column(db.Text)
+    status = db.Column(db.String(30))
+    payment_method = db.Column(db.String(50))
+    payment_status = db.Column(db.String(50))
+    reference_number = db.Column(db.String(255))
+    staff_id = db.Column(db.Integer, db.ForeignKey('staff.id', ondelete='SET NULL'))
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    pet = db.relationship('Pet', backref=db.backref('archived_appointments', lazy=True, cascade="all, delete-orphan"))
+    owner = db.relationship('User', backref=db.backref('archived_appointments', lazy=True, cascade="all, delete-orphan"))
+
+
+class WaitlistEntry(db.Model):
+    """A booking request waiting for a slot on a fully booked day. Promoted by waitlist.py."""
+    __tablename__ = 'waitlist'
+    __table_args__ = (db.Index('ix_waitlist_queue', 'day', 'service', 'status'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    pet_id = db.Column(db.Integer, db.ForeignKey('pet.id', ondelete='CASCADE'), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    service = db.Column(db.String(120), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    requested_at = db.Column(db.DateTime, nullable=False)  # the time the customer first asked for
+    urgency = db.Column(db.Integer, nullable=False, default=0)  # higher is served first
+    notes = db.Column(db.Text)
+    payment_method = db.Column(db.String(50))
+    status = db.Column(db.String(20), nullable=False, default='Waiting')  # Waiting, Promoted or Cancelled
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    promoted_at = db.Column(db.DateTime)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id', ondelete='SET NULL'))
+    pet = db.relationship('Pet', backref=db.backref('waitlist_entries', lazy=True, cascade="all, delete-orphan"))
+    owner = db.relationship('User', backref=db.backref('waitlist_entries', lazy=True, cascade="all, delete-orphan"))
+
+
+class ScheduleException(db.Model):
+    """Different clinic hours on one date: closed all day when opens/closes are empty."""
+    __tablename__ = 'schedule_exception'
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, unique=True)
+    opens = db.Column(db.Time)  # first bookable start time
+    closes = db.Column(db.Time)  # last bookable start time
+    reason = db.Column(db.String(120))
+
+
+class StaffMember(db.Model):
+    """Clinic staff, seeded from config.STAFF. Bookings are assigned by scheduler.py."""
+    __tablename__ = 'staff'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)
+    role = db.Column(db.String(80))
+    bio = db.Column(db.Text)
+    work_days = db.Column(db.String(7), nullable=False, default='012345')  # weekday digits, 0=Monday
+    work_start = db.Column(db.Time, nullable=False)
+    work_end = db.Column(db.Time, nullable=False)
+    skills = db.relationship('StaffSkill', backref='staff', lazy=True, cascade="all, delete-orphan")
+
+
+class StaffSkill(db.Model):
+    """A service a staff member is qualified to perform."""
+    staff_id = db.Column(db.Integer, db.ForeignKey('staff.id', ondelete='CASCADE'), primary_key=True)
+    service = db.Column(db.String(120), primary_key=True)
+
+
+class AuditEntry(db.Model):
+    """Append-only record of an admin or payment action. Written in batches by audit.py."""
+    __tablename__ = 'audit_log'
+    __table_args__ = (db.Index('ix_audit_log_target', 'target_type', 'target_id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+    actor_id = db.Column(db.Integer, index=True)
+    actor_email = db.Column(db.String(120))
+    action = db.Column(db.String(50), nullable=False, index=True)
+    target_type = db.Column(db.String(50), nullable=False)
+    target_id = db.Column(db.Integer)
+    old_values = db.Column(db.Text)  # JSON
+    new_values = db.Column(db.Text)  # JSON
+
+
+def reject_audit_change(mapper, connection, target):
+    raise RuntimeError('audit_log is append-only')
+
+event.listen(AuditEntry, 'before_update', reject_audit_change)
+event.listen(AuditEntry, 'before_delete', reject_audit_change)
+
+
+def reject_medical_record_change(mapper, connection, target):
+    raise RuntimeError('medical records are append-only; add a new entry instead')
+
+event.listen(MedicalRecord, 'before_update', reject_medical_record_change)
+
+
+# Appointment tables show pet and owner names, so any change to these
+# models drops this worker's cached fragments at once. Other workers see the
+# change through the fragment keys, which hash those names too.
+def invalidate_appointment_fragments(mapper, connection, target):
+    owner_id = target.id if isinstance(target, User) else target.owner_id
+    fragment_cache.invalidate('appointments', owner_id)
+    fragment_cache.invalidate('admin_appointments')
+
+for model in (User, Pet, Appointment):
+    for event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(model, event_name, invalidate_appointment_fragments)
+
+
+# Photo files are removed only once the change that drops them commits, so a
+# rolled-back edit or delete never leaves a pet pointing at missing files.
+def queue_photo_delete(target, token):
+    session = object_session(target)
+    if token and session is not None:
+        session.info.setdefault('stale_photos', []).append(token)
+
+
+def pet_deleted(mapper, connection, target):
+    queue_photo_delete(target, target.photo)
+
+
+def pet_photo_replaced(mapper, connection, target):
+    old = inspect(target).attrs.photo.history.deleted
+    if old:
+        queue_photo_delete(target, old[0])
+
+
+def delete_stale_photos(session):
+    for token in session.info.pop('stale_photos', []):
+        delete_photo(token)
+
+
+def keep_stale_photos(session, *args):
+    session.info.pop('stale_photos', None)
+
+event.listen(Pet, 'after_delete', pet_deleted)
+event.listen(Pet, 'after_update', pet_photo_replaced)
+event.listen(Session, 'after_commit', delete_stale_photos)
+event.listen(Session, 'after_rollback', keep_stale_photos)
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    return User.query.get(int(user_id))
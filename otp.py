@@ -1,18 +1,51 @@
-import os
 import random
 import string
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, func
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+from config import Config
 from db import execute, query_one  # Import DB functions from db.py
 
+# OTP tables, used through the raw db.py helpers. Declared once and compiled
+# for the database's dialect rather than written as MySQL-only DDL.
+metadata = MetaData()
+otp_register = Table(
+    'otp_register', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer),
+    Column('otp_code', String(10)),
+    Column('type', String(20)),
+    Column('email', String(120)),
+    Column('expires_at', DateTime),
+    Column('created_at', DateTime, server_default=func.current_timestamp()),
+    Index('ix_otp_register_lookup', 'user_id', 'otp_code', 'type'),
+)
+otp_login = Table(
+    'otp_login', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, nullable=False),
+    Column('otp_code', String(10), nullable=False),
+    Column('entered_at', DateTime, server_default=func.current_timestamp()),
+    Column('status', String(20), nullable=False),
+)
+
+
+def create_otp_tables():
+    """Create the OTP tables and indexes in the db.py database if missing."""
+    dialect = sqlite.dialect()
+    for table in metadata.sorted_tables:
+        execute(str(CreateTable(table, if_not_exists=True).compile(dialect=dialect)))
+        for index in table.indexes:
+            execute(str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect)))
+
+
 # Email configuration (from .env)
-SMTP_SERVER = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
-SMTP_PORT = int(os.getenv('EMAIL_PORT', 587))
-SMTP_USERNAME = os.getenv('EMAIL_USER')
-SMTP_PASSWORD = os.getenv('EMAIL_PASSWORD')
-FROM_EMAIL = os.getenv('EMAIL_USER')
+SMTP_SERVER = Config.EMAIL_HOST
+SMTP_PORT = Config.EMAIL_PORT
+SMTP_USERNAME = Config.EMAIL_USER
+SMTP_PASSWORD = Config.EMAIL_PASSWORD
+FROM_EMAIL = Config.EMAIL_USER
 
 def generate_otp(length=6):
     """Generate a random OTP code."""
@@ -23,6 +56,11 @@ def send_otp_email(to_email, otp_code, subject="Your OTP Code"):
     if not SMTP_USERNAME or not SMTP_PASSWORD:
         return True
 
+    # Imported here so workers that never send mail don't pay for them
+    import smtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
     msg = MIMEMultipart()
     msg['From'] = FROM_EMAIL
     msg['To'] = to_email
@@ -0,0 +1,127 @@
+import uuid
+from datetime import datetime, timedelta
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import Appointment, IdempotencyKey
+from audit import audit_log
+from query_budget import query_budget
+from waitlist import PROMOTION_QUERIES, promote_waitlist
+
+payments_bp = Blueprint('payments', __name__)
+
+MAX_STATUS_IDS = 100  # appointments per payment_status request
+KEY_RETENTION = timedelta(days=30)  # replays of older payment forms are no longer expected
+PRUNE_EVERY = 200  # confirmations between idempotency key sweeps
+
+_confirmations = 0
+
+
+def prune_idempotency_keys():
+    """Drop idempotency keys older than KEY_RETENTION."""
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < datetime.now() - KEY_RETENTION))
+    db.session.commit()
+
+
+@payments_bp.route('/payment/<int:appointment_id>/<float:amount>')
+@login_required
+def payment(appointment_id, amount):
+    appt = Appointment.query.get_or_404(appointment_id)
+    if appt.owner != current_user:
+        abort(403)
+    # amount is total_payable (subtotal + vat)
+    # Calculate subtotal and vat
+    subtotal = round(amount / 1.12, 2)
+    vat = round(amount - subtotal, 2)
+    # A fresh key per rendered page; resubmitting the same form reuses it
+    return render_template('payment.html', appointment_id=appointment_id, amount=subtotal, vat=vat, total_amount=amount,
+                           idempotency_key=uuid.uuid4().hex)
+
+@payments_bp.route('/confirm_payment/<int:appointment_id>', methods=['POST'])
+@login_required
+def confirm_payment(appointment_id):
+    global _confirmations
+    key = (request.form.get('idempotency_key') or uuid.uuid4().hex)[:64]
+    values = {'payment_status': 'Paid', 'status': 'Scheduled'}
+    if request.form.get('reference_number'):
+        values['reference_number'] = request.form['reference_number']
+    appointments = Appointment.__table__
+    try:
+        # The key's primary key rejects a repeated submit. Inserting it first
+        # also takes the write lock, so the row read below is current
+        db.session.execute(insert(IdempotencyKey).values(owner_id=current_user.id, key=key,
+                                                         appointment_id=appointment_id, created_at=datetime.now()))
+    except IntegrityError:
+        db.session.rollback()
+        used_for = db.session.execute(select(IdempotencyKey.appointment_id).where(
+            IdempotencyKey.owner_id == current_user.id, IdempotencyKey.key == key)).scalar()
+        if used_for != appointment_id:
+            flash('This payment form has expired. Please open the payment page again.', 'danger')
+            return redirect(url_for('appointments.appointments_list'))
+        flash('This payment was already recorded.', 'info')
+        return redirect(url_for('appointments.appointments_list'))
+
+    before = db.session.execute(
+        select(appointments.c.owner_id, appointments.c.status, appointments.c.payment_status,
+               appointments.c.reference_number)
+        .where(appointments.c.id == appointment_id).with_for_update()).mappings().first()
+    if before is None or before['owner_id'] != current_user.id:
+        db.session.rollback()
+        abort(404 if before is None else 403)
+    if before['payment_status'] == 'Paid':
+        db.session.rollback()
+        flash('This payment was already recorded.', 'info')
+        return redirect(url_for('appointments.appointments_list'))
+    # Still conditional, in case the row changed on a backend without row locks
+    updated = db.session.execute(update(appointments).where(
+        appointments.c.id == appointment_id, appointments.c.payment_status.is_distinct_from('Paid'),
+    ).values(**values)).rowcount
+    if not updated:
+        db.session.rollback()
+        flash('This payment was already recorded.', 'info')
+        return redirect(url_for('appointments.appointments_list'))
+    db.session.commit()
+    audit_log.record('payment.confirm', 'appointment', appointment_id,
+                     {name: before[name] for name in ('status', 'payment_status', 'reference_number')},
+                     {**values, 'idempotency_key': key})
+    _confirmations += 1
+    if _confirmations % PRUNE_EVERY == 0:
+        prune_idempotency_keys()
+    flash('Payment confirmed! Your appointment is now scheduled.', 'success')
+    return redirect(url_for('appointments.appointments_list'))
+
+@payments_bp.route('/payments/status')
+@query_budget(2)
+@login_required
+def payment_status():
+    """Payment state of the current user's appointments, for polling: ?ids=1,2,3"""
+    try:
+        ids = {int(i) for i in request.args.get('ids', '').split(',') if i.strip()}
+    except ValueError:
+        abort(400)
+    if len(ids) > MAX_STATUS_IDS:
+        abort(400)
+    appointments = Appointment.__table__
+    rows = db.session.execute(
+        select(appointments.c.id, appointments.c.status, appointments.c.payment_status)
+        .where(appointments.c.owner_id == current_user.id, appointments.c.id.in_(ids))
+    ) if ids else []
+    response = jsonify({str(id): {'status': status, 'payment_status': payment_status, 'paid': payment_status == 'Paid'}
+                        for id, status, payment_status in rows})
+    response.cache_control.no_store = True
+    return response
+
+@payments_bp.route('/cancel_payment/<int:appointment_id>', methods=['GET'])
+@query_budget(4 + PROMOTION_QUERIES)
+@login_required
+def cancel_payment(appointment_id):
+    appt = Appointment.query.get_or_404(appointment_id)
+    if appt.owner != current_user:
+        abort(403)
+    db.session.delete(appt)
+    db.session.commit()
+    promote_waitlist()
+    flash('Appointment cancelled.', 'info')
+    return redirect(url_for('main.dashboard'))
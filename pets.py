@@ -0,0 +1,84 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, abort, send_from_directory
+from flask_login import login_required, current_user
+from extensions import db, csrf
+from sqlalchemy.orm import undefer
+from models import Pet, MedicalRecord
+from forms import PetForm
+from query_budget import query_budget
+from photos import save_photo, upload_dir
+from waitlist import PROMOTION_QUERIES, promote_waitlist
+
+pets_bp = Blueprint('pets', __name__)
+
+
+@pets_bp.route('/pets')
+@login_required
+def pets_list():
+    return render_template('pets.html', pets=current_user.pets)
+
+@pets_bp.route('/pets/new', methods=['GET', 'POST'])
+@login_required
+def pet_new():
+    form = PetForm()
+    if form.validate_on_submit():
+        pet = Pet(name=form.name.data, breed=form.breed.data, age=form.age.data, owner=current_user)
+        if form.medical_entry.data and form.medical_entry.data.strip():
+            pet.add_medical_record(form.medical_entry.data.strip(), current_user)
+        if form.photo_file.data:
+            pet.photo = save_photo(form.photo_file.data)
+        db.session.add(pet)
+        db.session.commit()
+        flash('Pet added successfully.', 'success')
+        return redirect(url_for('pets.pets_list'))
+    return render_template('pet_form.html', form=form, title='Add Pet', form_action=url_for('pets.pet_new'))
+
+@pets_bp.route('/pets/<int:id>/edit', methods=['GET', 'POST'])
+@login_required
+def pet_edit(id):
+    pet = Pet.query.get_or_404(id)
+    if pet.owner != current_user:
+        abort(403)
+    form = PetForm(obj=pet)
+    if form.validate_on_submit():
+        pet.name = form.name.data
+        pet.breed = form.breed.data
+        pet.age = form.age.data
+        if form.medical_entry.data and form.medical_entry.data.strip():
+            pet.add_medical_record(form.medical_entry.data.strip(), current_user)
+        if form.photo_file.data:
+            pet.photo = save_photo(form.photo_file.data)  # old files go once this commits
+        db.session.commit()
+        flash('Pet updated successfully!', 'success')
+        return redirect(url_for('pets.pets_list'))
+    return render_template('pet_form.html', form=form, title='Edit Pet', form_action=url_for('pets.pet_edit', id=id), pet=pet)
+
+@pets_bp.route('/pets/<int:id>/history')
+@login_required
+def pet_history(id):
+    pet = Pet.query.get_or_404(id)
+    if pet.owner != current_user and current_user.role != 'admin':
+        abort(403)
+    records = pet.medical_records.options(undefer(MedicalRecord.entry)).all()
+    return render_template('pet_history.html', pet=pet, records=records)
+
+@pets_bp.route('/pets/<int:id>/delete', methods=['POST'])
+@query_budget(10 + PROMOTION_QUERIES)
+@login_required
+@csrf.exempt
+def pet_delete(id):
+    pet = Pet.query.get_or_404(id)
+    if pet.owner != current_user:
+        abort(403)
+    db.session.delete(pet)
+    db.session.commit()
+    promote_waitlist()  # the pet's appointments are deleted with it
+    flash('Pet deleted successfully!', 'info')
+    return redirect(url_for('pets.pets_list'))
+
+@pets_bp.route('/pets/photos/<filename>')
+def photo(filename):
+    # File names carry a random token and never change, so caches may keep them
+    response = send_from_directory(upload_dir(), filename, max_age=31536000)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,77 @@
+"""Pet photo uploads.
+
+Uploads are checked with Pillow in the request, so a file that merely has
+an image extension is rejected before a token is stored. They are copied
+to disk in fixed-size chunks, never read whole into memory. Thumbnails and
+WebP versions are generated in a process pool off the request thread.
+Every file name contains a random token, so files never change and are
+served with long-lived cache headers.
+"""
+import glob
+import multiprocessing
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from thumbnails import make_thumbnails
+
+ALLOWED_EXTENSIONS = ('jpg', 'jpeg', 'png', 'gif', 'webp')
+CHUNK_SIZE = 64 * 1024
+
+_pool = None
+
+
+def upload_dir(app=None):
+    app = app or current_app
+    path = app.config.get('PHOTO_UPLOAD_DIR') or os.path.join(app.instance_path, 'uploads', 'pets')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def pool():
+    """The thumbnail process pool, created on first use in each worker."""
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the web worker has threads (audit flusher, DB pools)
+        _pool = ProcessPoolExecutor(max_workers=current_app.config.get('PHOTO_WORKERS', 2),
+                                    mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def is_image(stream):
+    """True if Pillow can read ``stream`` as an image of an allowed type.
+
+    Only the headers and structure are checked, not the full pixel data, so
+    this is cheap enough to run on the request thread. The stream is rewound.
+    """
+    from PIL import Image  # loaded on the first upload, not at worker startup
+
+    try:
+        with Image.open(stream) as image:
+            image.verify()
+            return (image.format or '').lower() in ALLOWED_EXTENSIONS
+    except Exception:  # Pillow raises a variety of errors for corrupt files
+        return False
+    finally:
+        stream.seek(0)
+
+
+def save_photo(file_storage):
+    """Stream an uploaded file to disk and queue its thumbnails. Returns the photo token."""
+    extension = file_storage.filename.rsplit('.', 1)[-1].lower()
+    token = uuid.uuid4().hex
+    directory = upload_dir()
+    source = os.path.join(directory, f'{token}.{extension}')
+    with open(source, 'wb') as out:
+        shutil.copyfileobj(file_storage.stream, out, CHUNK_SIZE)
+    pool().submit(make_thumbnails, source, directory, token)
+    return token
+
+
+def delete_photo(token):
+    """Remove the original and generated files for ``token``."""
+    if not token:
+        return
+    for path in glob.glob(os.path.join(upload_dir(), f'{token}*')):
+        os.remove(path)
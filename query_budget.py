@@ -0,0 +1,72 @@
+"""Per-request SQL query counting with budgets, to catch N+1 regressions.
+
+Every statement sent through the SQLAlchemy engine or the raw ``db.py``
+helpers during a request is recorded. A route's budget comes from
+``@query_budget(n)`` on the view, else ``QUERY_BUDGETS[endpoint]``, else
+``QUERY_BUDGET_DEFAULT``. With ``QUERY_BUDGET_ENFORCE`` on (as in tests and
+check_query_budgets.py) a request over budget raises QueryBudgetExceeded
+listing the captured SQL; otherwise it is only logged.
+"""
+from functools import wraps
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import db as raw_db
+
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, endpoint, budget, statements):
+        self.endpoint = endpoint
+        self.budget = budget
+        self.statements = statements
+        listing = '\n'.join(f'  {i}. {sql}' for i, sql in enumerate(statements, 1))
+        super().__init__(f'{endpoint} ran {len(statements)} queries (budget {budget}):\n{listing}')
+
+
+def query_budget(limit):
+    """Allow the decorated view at most ``limit`` queries per request."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            g.query_budget = limit
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def record(statement):
+    # g is per app context, so background flushes (audit log) are not counted
+    if has_app_context() and 'query_log' in g:
+        g.query_log.append(' '.join(statement.split()))
+
+
+def on_engine_execute(conn, cursor, statement, parameters, context, executemany):
+    record(statement)
+
+
+def start_request():
+    g.query_log = []
+
+
+def check_budget(response):
+    statements = g.pop('query_log', None)
+    if statements is None or request.endpoint is None:
+        return response
+    config = current_app.config
+    budget = g.get('query_budget') or config['QUERY_BUDGETS'].get(request.endpoint) or config['QUERY_BUDGET_DEFAULT']
+    if len(statements) > budget:
+        error = QueryBudgetExceeded(request.endpoint, budget, statements)
+        if config['QUERY_BUDGET_ENFORCE']:
+            raise error
+        current_app.logger.warning(str(error))
+    return response
+
+
+def init_query_budget(app):
+    """Count queries for each request of ``app`` and check them on the way out."""
+    if not event.contains(Engine, 'before_cursor_execute', on_engine_execute):
+        event.listen(Engine, 'before_cursor_execute', on_engine_execute)
+    if record not in raw_db.query_hooks:
+        raw_db.query_hooks.append(record)
+    app.before_request(start_request)
+    app.after_request(check_budget)
@@ -0,0 +1,267 @@
+"""Revenue and utilization reports over a cached columnar extract.
+
+All appointments (hot and archived) are pulled once, in a single streamed
+query, into compact ``array`` columns. Later refreshes only fetch rows with a
+higher id, and only the cached reports whose window covers the new days are
+dropped. Edits to reported fields and deletes seen by this process trigger a
+full reload; so does a row count that no longer matches the database, checked
+every COUNT_CHECK_AFTER seconds.
+
+Revenue counts paid appointments only (paid online, or completed at the
+clinic). Unpaid ones are reported as outstanding and cancelled ones are
+counted separately.
+
+Aggregates use NumPy ``bincount`` when NumPy is installed, and a plain
+Python pass over the arrays otherwise.
+"""
+import threading
+import time
+from array import array
+from datetime import date, timedelta
+from sqlalchemy import event, func, inspect, select, union_all
+from config import SERVICES, service_durations, service_prices
+from extensions import db
+from models import Appointment, ArchivedAppointment
+
+try:
+    import numpy as np
+except ImportError:  # optional; reports fall back to pure Python
+    np = None
+
+PERIODS = ('day', 'week', 'month')
+DIMENSIONS = ('service', 'payment_method')
+VAT_RATE = 0.12
+FULL_RELOAD_AFTER = 600  # seconds; also catches edits made by other workers
+COUNT_CHECK_AFTER = 60  # seconds between row-count checks for deletes made elsewhere
+REPORTED_FIELDS = ('service', 'scheduled_at', 'payment_method', 'status', 'payment_status')
+
+# Payment state of each extracted row
+PAID, UNPAID, CANCELLED = 0, 1, 2
+
+
+def payment_state(status, payment_status):
+    if status == 'Cancelled':
+        return CANCELLED
+    if payment_status == 'Paid' or status == 'Completed':
+        return PAID
+    return UNPAID
+STREAM_BATCH = 5000
+
+
+def week_start(ordinal):
+    # date.fromordinal(1) is a Monday, so weeks start on Monday
+    return ordinal - (ordinal - 1) % 7
+
+
+class AppointmentExtract:
+    """Columnar copy of the appointment fields the reports need."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.codes = {
+            'service': {s['title']: i for i, s in enumerate(SERVICES)},
+            'payment_method': {'pay_now': 0, 'pay_on_site': 1},
+        }
+        self.results = {}
+        self.reset()
+
+    def reset(self):
+        self.days = array('q')  # date ordinal
+        self.months = array('q')  # year * 12 + month - 1
+        self.service = array('H')
+        self.payment_method = array('H')
+        self.state = array('B')
+        self.max_id = 0
+        self.loaded_at = None
+        self.checked_at = None
+        self.dirty = True
+        self.results.clear()
+
+    def code(self, dimension, value):
+        table = self.codes[dimension]
+        if value not in table:
+            table[value] = len(table)
+        return table[value]
+
+    def labels(self, dimension):
+        table = self.codes[dimension]
+        return sorted(table, key=table.get)
+
+    def _stream(self, after_id):
+        selects = [select(t.c.id, t.c.scheduled_at, t.c.service, t.c.payment_method, t.c.status,
+                          t.c.payment_status).where(t.c.id > after_id)
+                   for t in (Appointment.__table__, ArchivedAppointment.__table__)]
+        stmt = union_all(*selects).execution_options(yield_per=STREAM_BATCH)
+        new_days = set()
+        for rows in db.session.execute(stmt).partitions():
+            for appointment_id, scheduled_at, service, method, status, payment_status in rows:
+                day = scheduled_at.toordinal()
+                self.days.append(day)
+                self.months.append(scheduled_at.year * 12 + scheduled_at.month - 1)
+                self.service.append(self.code('service', service))
+                self.payment_method.append(self.code('payment_method', method))
+                self.state.append(payment_state(status, payment_status))
+                self.max_id = max(self.max_id, appointment_id)
+                new_days.add(day)
+        return new_days
+
+    def _row_count(self):
+        counts = [select(func.count()).select_from(t).scalar_subquery()
+                  for t in (Appointment.__table__, ArchivedAppointment.__table__)]
+        return db.session.execute(select(counts[0] + counts[1])).scalar()
+
+    def refresh(self):
+        """Bring the extract up to date with the database."""
+        now = time.monotonic()
+        stale = self.loaded_at is None or now - self.loaded_at > FULL_RELOAD_AFTER
+        if self.dirty or stale:
+            self.reset()
+            self._stream(0)
+            self.dirty = False
+            self.loaded_at = self.checked_at = now
+            return
+        new_days = self._stream(self.max_id)
+        # Counting both tables is a full scan on InnoDB, so only now and then
+        if now - self.checked_at > COUNT_CHECK_AFTER:
+            self.checked_at = now
+            count_changed = len(self.days) != self._row_count()
+        else:
+            count_changed = False
+        if count_changed:
+            # Rows were deleted elsewhere; incremental state can't be trusted
+            self.dirty = True
+            self.refresh()
+            return
+        if new_days:
+            for key in [k for k in self.results if any(k[0] <= d < k[1] for d in new_days)]:
+                del self.results[key]
+
+    def aggregate(self, start, end, period='month', by='service'):
+        """Rows of {period, group, count, minutes, subtotal, vat, total, outstanding, cancelled} for [start, end).
+
+        ``count`` and ``minutes`` exclude cancelled appointments; the money
+        columns are paid revenue, and ``outstanding`` is unpaid (with VAT).
+        """
+        with self.lock:
+            self.refresh()
+            key = (start.toordinal(), end.toordinal(), period, by)
+            if key not in self.results:
+                self.results[key] = self._aggregate(key[0], key[1], period, by)
+            return self.results[key]
+
+    def _aggregate(self, start, end, period, by):
+        groups = self.labels(by)
+        services = self.labels('service')
+        prices = [float(service_prices.get(s, 0.0)) for s in services]
+        minutes = [service_durations.get(s, 0) for s in services]
+        if np is not None:
+            sums = self._sums_numpy(start, end, period, by, len(groups), prices, minutes)
+        else:
+            sums = self._sums_python(start, end, period, by, prices, minutes)
+
+        rows = []
+        for (p, g), (count, booked, subtotal, unpaid, cancelled) in sorted(sums.items()):
+            subtotal = round(subtotal, 2)
+            vat = round(subtotal * VAT_RATE, 2)
+            rows.append({'period': self.period_label(p, period), 'group': groups[g], 'count': count,
+                         'minutes': booked, 'subtotal': subtotal, 'vat': vat, 'total': round(subtotal + vat, 2),
+                         'outstanding': round(unpaid * (1 + VAT_RATE), 2), 'cancelled': cancelled})
+        return rows
+
+    def _sums_numpy(self, start, end, period, by, n_groups, prices, minutes):
+        days = np.frombuffer(self.days, dtype=np.int64)
+        mask = (days >= start) & (days < end)
+        if period == 'month':
+            keys = np.frombuffer(self.months, dtype=np.int64)[mask]
+        else:
+            keys = days[mask]
+            if period == 'week':
+                keys = keys - (keys - 1) % 7
+        service = np.frombuffer(self.service, dtype=np.uint16)[mask].astype(np.int64)
+        group = np.frombuffer(getattr(self, by), dtype=np.uint16)[mask].astype(np.int64)
+        state = np.frombuffer(self.state, dtype=np.uint8)[mask]
+        active = state != CANCELLED
+        price = np.asarray(prices, dtype=np.float64)[service]
+        periods, period_index = np.unique(keys, return_inverse=True)
+        slot = period_index * n_groups + group
+        size = len(periods) * n_groups
+        rows = np.bincount(slot, minlength=size)
+        counts = np.bincount(slot, weights=active, minlength=size)
+        booked = np.bincount(slot, weights=np.asarray(minutes, dtype=np.float64)[service] * active, minlength=size)
+        subtotal = np.bincount(slot, weights=price * (state == PAID), minlength=size)
+        unpaid = np.bincount(slot, weights=price * (state == UNPAID), minlength=size)
+        cancelled = rows - counts
+        return {(int(periods[i // n_groups]), i % n_groups):
+                (int(counts[i]), int(booked[i]), float(subtotal[i]), float(unpaid[i]), int(cancelled[i]))
+                for i in np.flatnonzero(rows)}
+
+    def _sums_python(self, start, end, period, by, prices, minutes):
+        periods = self.months if period == 'month' else self.days
+        groups = getattr(self, by)
+        sums = {}
+        for i, day in enumerate(self.days):
+            if not start <= day < end:
+                continue
+            p = periods[i]
+            if period == 'week':
+                p = week_start(p)
+            s = self.service[i]
+            state = self.state[i]
+            count, booked, subtotal, unpaid, cancelled = sums.get((p, groups[i]), (0, 0, 0.0, 0.0, 0))
+            if state == CANCELLED:
+                cancelled += 1
+            else:
+                count += 1
+                booked += minutes[s]
+                if state == PAID:
+                    subtotal += prices[s]
+                else:
+                    unpaid += prices[s]
+            sums[(p, groups[i])] = (count, booked, subtotal, unpaid, cancelled)
+        return sums
+
+    @staticmethod
+    def period_label(key, period):
+        if period == 'month':
+            return f'{key // 12}-{key % 12 + 1:02d}'
+        if period == 'week':
+            return f'Week of {date.fromordinal(key).isoformat()}'
+        return date.fromordinal(key).isoformat()
+
+
+extract = AppointmentExtract()
+
+
+def revenue_report(start, end, period='month', by='service'):
+    """Grouped revenue, VAT, counts and booked minutes for [start, end)."""
+    if period not in PERIODS or by not in DIMENSIONS:
+        raise ValueError(f'Unsupported report: period={period!r}, by={by!r}')
+    return extract.aggregate(start, end, period, by)
+
+
+def default_window(today=None):
+    """The last twelve months, ending tomorrow."""
+    today = today or date.today()
+    return today.replace(year=today.year - 1, day=1), today + timedelta(days=1)
+
+
+def mark_dirty(mapper, connection, target):
+    extract.dirty = True
+
+
+def mark_dirty_if_reported(mapper, connection, target):
+    # Notes or staff edits don't change any report
+    attrs = inspect(target).attrs
+    if any(attrs[name].history.has_changes() for name in REPORTED_FIELDS):
+        extract.dirty = True
+
+
+def mark_dirty_on_core_update(orm_execute_state):
+    # Core UPDATEs (payments.confirm_payment) bypass the mapper events
+    if orm_execute_state.is_update and getattr(orm_execute_state.statement, 'table', None) is Appointment.__table__:
+        extract.dirty = True
+
+for model in (Appointment, ArchivedAppointment):
+    event.listen(model, 'after_update', mark_dirty_if_reported)
+    event.listen(model, 'after_delete', mark_dirty)
+event.listen(db.session, 'do_orm_execute', mark_dirty_on_core_update)
@@ -0,0 +1,241 @@
+"""Assigns appointments to staff and builds the daily staff board.
+
+Each booking goes to the least-loaded staff member who is qualified for the
+service, works that day and hour, and is free for the service's duration.
+Load is the number of booked minutes that day. Candidates come from a
+min-heap per (day, service), so picking one is O(log n) in the staff count.
+
+Two requests can pick the same free member from the same snapshot, so views
+call confirm_staff() after flushing a booking: it re-reads the day with a
+locking read and keeps the booking's member only if they are still free.
+"""
+import heapq
+import threading
+import time as clock
+from collections import namedtuple
+from datetime import datetime, timedelta, time
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import joinedload, selectinload
+from config import STAFF, STAFF_WORK_DAYS, STAFF_WORK_START, STAFF_WORK_END, service_durations
+from extensions import db
+from models import Appointment, StaffMember, StaffSkill
+
+DEFAULT_DURATION = 30  # minutes, for services missing from service_durations
+BOARD_TTL = 30  # seconds a prebuilt board is served before being rebuilt
+
+Staff = namedtuple('Staff', 'id name role services work_days work_start work_end')
+
+_roster = None
+_boards = {}
+_lock = threading.Lock()
+
+
+def duration_of(service):
+    return timedelta(minutes=service_durations.get(service, DEFAULT_DURATION))
+
+
+# ------------------- ROSTER -------------------
+def seed_staff():
+    """Create the staff table rows from config.STAFF if it is empty."""
+    if StaffMember.query.first():
+        return
+    start = datetime.strptime(STAFF_WORK_START, '%H:%M').time()
+    end = datetime.strptime(STAFF_WORK_END, '%H:%M').time()
+    for member in STAFF:
+        staff = StaffMember(name=member['name'], role=member['role'], bio=member['bio'],
+                            work_days=STAFF_WORK_DAYS, work_start=start, work_end=end)
+        staff.skills = [StaffSkill(service=service) for service in member.get('services', [])]
+        db.session.add(staff)
+    db.session.commit()
+    reload_roster()
+
+
+def roster():
+    """Staff with their skills, loaded once per process (see reload_roster)."""
+    global _roster
+    if _roster is None:
+        members = StaffMember.query.options(selectinload(StaffMember.skills)).order_by(StaffMember.id).all()
+        _roster = [Staff(m.id, m.name, m.role, frozenset(s.service for s in m.skills),
+                         m.work_days, m.work_start, m.work_end) for m in members]
+    return _roster
+
+
+def reload_roster():
+    """Call after editing staff, skills or working hours."""
+    global _roster
+    _roster = None
+    with _lock:
+        _boards.clear()
+
+
+# ------------------- ASSIGNMENT -------------------
+class DaySchedule:
+    """Bookings and load per staff member for one day."""
+
+    def __init__(self, day, staff, bookings):
+        self.day = day
+        self.staff = {s.id: s for s in staff if str(day.weekday()) in s.work_days}
+        self.load = {staff_id: 0 for staff_id in self.staff}
+        self.booked = {staff_id: [] for staff_id in self.staff}
+        self.heaps = {}
+        for staff_id, service, start in bookings:
+            if staff_id in self.staff:
+                self._book(staff_id, start, start + duration_of(service))
+
+    def _heap(self, service):
+        heap = self.heaps.get(service)
+        if heap is None:
+            heap = [(self.load[i], i) for i, s in self.staff.items() if service in s.services]
+            heapq.heapify(heap)
+            self.heaps[service] = heap
+        return heap
+
+    def _book(self, staff_id, start, end):
+        self.booked[staff_id].append((start, end))
+        self.load[staff_id] += int((end - start).total_seconds() // 60)
+        # Old heap entries for this member become stale; they are skipped when popped
+        for service, heap in self.heaps.items():
+            if service in self.staff[staff_id].services:
+                heapq.heappush(heap, (self.load[staff_id], staff_id))
+
+    def is_available(self, staff_id, start, end):
+        """Free from ``start`` to ``end``, which must fall within the member's hours that day."""
+        member = self.staff[staff_id]
+        if start.date() != self.day or start.time() < member.work_start:
+            return False
+        if end > datetime.combine(self.day, member.work_end):
+            return False
+        return all(end <= b_start or start >= b_end for b_start, b_end in self.booked[staff_id])
+
+    def assign(self, service, start):
+        """Book the least-loaded free qualified member; returns their id or None."""
+        end = start + duration_of(service)
+        heap = self._heap(service)
+        busy = []
+        chosen = None
+        while heap:
+            load, staff_id = heapq.heappop(heap)
+            if load != self.load[staff_id]:
+                continue
+            if self.is_available(staff_id, start, end):
+                chosen = staff_id
+                break
+            busy.append((load, staff_id))
+        for entry in busy:
+            heapq.heappush(heap, entry)
+        if chosen is not None:
+            self._book(chosen, start, end)
+        return chosen
+
+
+def load_day(day, exclude_id=None, lock=False):
+    """Build the DaySchedule for ``day`` from one indexed query.
+
+    With ``lock``, the rows are read FOR UPDATE, which sees every committed
+    booking and holds off concurrent ones until this transaction ends.
+    """
+    start = datetime.combine(day, time.min)
+    query = db.session.query(Appointment.staff_id, Appointment.service, Appointment.scheduled_at).filter(
+        Appointment.scheduled_at >= start,
+        Appointment.scheduled_at < start + timedelta(days=1),
+        Appointment.staff_id.isnot(None),
+    )
+    if exclude_id is not None:
+        query = query.filter(Appointment.id != exclude_id)
+    if lock:
+        query = query.with_for_update()
+    return DaySchedule(day, roster(), query.all())
+
+
+def staff_hours_error(service, start):
+    """Why no qualified member's hours can fit ``service`` at ``start``, or None.
+
+    Only the roster is read, so this costs no queries. Views check it before
+    assign_staff(), whose None means "busy" and offers the waitlist, which can
+    never be filled for a booking that runs past everyone's hours.
+    """
+    day = start.date()
+    end = start + duration_of(service)
+    members = [s for s in roster() if service in s.services and str(day.weekday()) in s.work_days]
+    if not members:
+        return f'No staff who provide {service} work on {day:%A}s. Please choose another day.'
+    if any(datetime.combine(day, s.work_start) <= start and end <= datetime.combine(day, s.work_end)
+           for s in members):
+        return None
+    first = min(s.work_start for s in members)
+    last = max(datetime.combine(day, s.work_end) - duration_of(service) for s in members)
+    minutes = int(duration_of(service).total_seconds() // 60)
+    return (f'{service} takes {minutes} minutes, which falls outside staff hours at that time. '
+            f'Please choose a start between {first:%I:%M %p} and {last:%I:%M %p}.')
+
+
+def assign_staff(service, scheduled_at, exclude_id=None):
+    """Staff id for a new (or moved) booking, or None if nobody is free."""
+    return load_day(scheduled_at.date(), exclude_id).assign(service, scheduled_at)
+
+
+def confirm_staff(appt):
+    """Re-check ``appt``'s staff member before commit; returns the final staff id or None.
+
+    Flushes ``appt`` first, so on SQLite this transaction already holds the
+    write lock and reads the latest data. If another booking took the member
+    meanwhile, the least-loaded free member is assigned instead. On None the
+    caller should roll back: nobody is free any more.
+    """
+    db.session.flush()
+    schedule = load_day(appt.scheduled_at.date(), exclude_id=appt.id, lock=True)
+    end = appt.scheduled_at + duration_of(appt.service)
+    if appt.staff_id in schedule.staff and schedule.is_available(appt.staff_id, appt.scheduled_at, end):
+        return appt.staff_id
+    appt.staff_id = schedule.assign(appt.service, appt.scheduled_at)
+    return appt.staff_id
+
+
+# ------------------- DAILY BOARD -------------------
+def daily_board(day):
+    """Per-staff list of the day's appointments, prebuilt and served from memory."""
+    with _lock:
+        cached = _boards.get(day)
+        if cached and clock.monotonic() - cached[0] < BOARD_TTL:
+            return cached[1]
+
+    start = datetime.combine(day, time.min)
+    appointments = (Appointment.query
+                    .options(joinedload(Appointment.pet), joinedload(Appointment.owner))
+                    .filter(Appointment.scheduled_at >= start,
+                            Appointment.scheduled_at < start + timedelta(days=1))
+                    .order_by(Appointment.scheduled_at).all())
+    rows = {s.id: [] for s in roster()}
+    unassigned = []
+    for a in appointments:
+        row = {
+            'id': a.id,
+            'time': a.scheduled_at.strftime('%H:%M'),
+            'minutes': int(duration_of(a.service).total_seconds() // 60),
+            'service': a.service,
+            'pet': a.pet.name,
+            'owner': a.owner.name,
+            'status': a.status,
+        }
+        rows.get(a.staff_id, unassigned).append(row)
+    board = {
+        'staff': [{'member': s, 'appointments': rows[s.id],
+                   'booked_minutes': sum(r['minutes'] for r in rows[s.id])}
+                  for s in roster() if str(day.weekday()) in s.work_days or rows[s.id]],
+        'unassigned': unassigned,
+    }
+    with _lock:
+        _boards[day] = (clock.monotonic(), board)
+    return board
+
+
+def invalidate_board(mapper, connection, target):
+    """Drop the boards of the booking's day and, if it was moved, its old day."""
+    days = {target.scheduled_at.date()}
+    days.update(old.date() for old in inspect(target).attrs.scheduled_at.history.deleted if old)
+    with _lock:
+        for day in days:
+            _boards.pop(day, None)
+
+for event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Appointment, event_name, invalidate_board)
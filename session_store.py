@@ -0,0 +1,256 @@
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from flask.sessions import SessionInterface, SessionMixin
+from flask.json.tag import TaggedJSONSerializer
+
+# Session ids are 32 random bytes, urlsafe-base64 encoded (43 characters)
+SID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{43}$')
+
+serializer = TaggedJSONSerializer()
+
+
+# ------------------- STORES -------------------
+class SessionStore:
+    """Interface for server-side session backends.
+
+    Shared stores (Redis, Memcached, a database table) implement the same
+    four methods so every worker behind the load balancer sees one session.
+    """
+
+    def load(self, sid):
+        """Return (session dict, expiry timestamp), or None if missing or expired."""
+        raise NotImplementedError
+
+    def save(self, sid, data, ttl):
+        """Store the session dict for ``ttl`` seconds."""
+        raise NotImplementedError
+
+    def delete(self, sid):
+        raise NotImplementedError
+
+    def touch(self, sid, ttl):
+        """Push back the expiry of an existing session without rewriting it."""
+        raise NotImplementedError
+
+    def purge_expired(self):
+        """Drop expired sessions. Stores with native TTLs can ignore this."""
+
+
+class SQLiteSessionStore(SessionStore):
+    """Local file store for single-node deployments."""
+
+    purge_every = 500  # saves between expired-row sweeps
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._saves = 0
+        conn = self._conn()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            sid TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        # A forked worker must not reuse its parent's connection
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def load(self, sid):
+        row = self._conn().execute("SELECT data, expires_at FROM sessions WHERE sid=? AND expires_at > ?",
+                                   (sid, time.time())).fetchone()
+        return (serializer.loads(row[0]), row[1]) if row else None
+
+    def save(self, sid, data, ttl):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)",
+                     (sid, serializer.dumps(data), time.time() + ttl))
+        conn.commit()
+        self._saves += 1
+        if self._saves % self.purge_every == 0:
+            self.purge_expired()
+
+    def delete(self, sid):
+        conn = self._conn()
+        conn.execute("DELETE FROM sessions WHERE sid=?", (sid,))
+        conn.commit()
+
+    def touch(self, sid, ttl):
+        conn = self._conn()
+        conn.execute("UPDATE sessions SET expires_at=? WHERE sid=? AND expires_at > ?",
+                     (time.time() + ttl, sid, time.time()))
+        conn.commit()
+
+    def purge_expired(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+        conn.commit()
+
+
+class RedisSessionStore(SessionStore):
+    """Shared store for multi-worker deployments. Requires the ``redis`` package."""
+
+    def __init__(self, url, prefix='session:'):
+        import redis  # optional dependency, only needed for this backend
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def load(self, sid):
+        raw, ttl = self.client.pipeline().get(self.prefix + sid).ttl(self.prefix + sid).execute()
+        return (serializer.loads(raw.decode('utf-8')), time.time() + ttl) if raw else None
+
+    def save(self, sid, data, ttl):
+        self.client.setex(self.prefix + sid, int(ttl), serializer.dumps(data))
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+    def touch(self, sid, ttl):
+        self.client.expire(self.prefix + sid, int(ttl))
+
+
+def create_session_store(config):
+    """Build the store selected by ``SESSION_BACKEND`` ('sqlite' or 'redis')."""
+    backend = config.get('SESSION_BACKEND', 'sqlite')
+    if backend == 'redis':
+        return RedisSessionStore(config['SESSION_REDIS_URL'])
+    if backend == 'sqlite':
+        path = config.get('SESSION_SQLITE_PATH') or os.path.join(
+            os.path.dirname(__file__), 'instance', 'sessions.db')
+        return SQLiteSessionStore(path)
+    raise ValueError(f'Unknown SESSION_BACKEND: {backend}')
+
+
+# ------------------- SESSION -------------------
+class ServerSideSession(SessionMixin):
+    """Session whose data is fetched from the store on first access only."""
+
+    def __init__(self, sid=None, loader=None):
+        self.sid = sid
+        self._loader = loader
+        self._data = None if loader else {}
+        self.new = sid is None
+        self.modified = False
+        self.accessed = False
+        self.expires_at = None  # when the store drops it, as loaded
+        self.replaced_sid = None  # old id to drop from the store, see regenerate()
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    @property
+    def data(self):
+        self.accessed = True
+        if self._data is None:
+            stored = self._loader(self.sid)
+            if stored is None:
+                # Unknown or expired id: never adopt an id the client picked
+                self.sid = None
+                self.new = True
+                stored = ({}, None)
+            self._data, self.expires_at = stored
+        return self._data
+
+    def regenerate(self):
+        """Move the data to a fresh id on the next save; call on login."""
+        data = self.data
+        if self.sid is not None:
+            self.replaced_sid = self.sid
+        self.sid = None
+        self._data = data
+        self.modified = True
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keeps session data in a ``SessionStore``; the cookie only carries the id."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and SID_PATTERN.match(sid):
+            return ServerSideSession(sid, loader=self.store.load)
+        return ServerSideSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        # Handlers that never touched the session cost no store round-trip
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if session.replaced_sid is not None:
+            self.store.delete(session.replaced_sid)
+
+        ttl = app.permanent_session_lifetime.total_seconds()
+        if not session.modified:
+            # Keep a permanent session alive without rewriting its data, at
+            # most once per half lifetime so page views don't all write
+            if (session.loaded and session.sid is not None and session.permanent
+                    and app.config['SESSION_REFRESH_EACH_REQUEST']
+                    and session.expires_at - time.time() < ttl / 2):
+                self.store.touch(session.sid, ttl)
+                self._set_cookie(app, session, response)
+            return
+
+        if not session:
+            if session.sid is not None:
+                self.store.delete(session.sid)
+            if session.sid is not None or session.replaced_sid is not None:
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        self.store.save(session.sid, dict(session.data), ttl)
+        self._set_cookie(app, session, response)
+
+    def _set_cookie(self, app, session, response):
+        response.set_cookie(
+            self.get_cookie_name(app),
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=self.get_cookie_domain(app),
+            path=self.get_cookie_path(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from jinja2 import nodes, FileSystemBytecodeCache
+from jinja2.ext import Extension
+
+
+# ------------------- FRAGMENT CACHE -------------------
+class FragmentCache:
+    """In-process LRU cache of rendered template fragments.
+
+    Keys are tuples of explicit parts, e.g. ('appointments', user_id, version).
+    ``invalidate('appointments')`` drops every key starting with those parts.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires_at = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *prefix):
+        """Drop all fragments whose key starts with ``prefix``."""
+        prefix = tuple(str(p) for p in prefix)
+        with self._lock:
+            for key in [k for k in self._entries if k[:len(prefix)] == prefix]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+fragment_cache = FragmentCache()
+
+
+class FragmentCacheExtension(Extension):
+    """Adds ``{% cache 'name', part, ... [, timeout=seconds] %}...{% endcache %}``.
+
+    Only cache markup that is the same for everyone who shares the key: never
+    wrap CSRF tokens, flashed messages or anything else per-request.
+    """
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        timeout = nodes.Const(None)
+        while parser.stream.skip_if('comma'):
+            if parser.stream.current.test('name:timeout') and parser.stream.look().test('assign'):
+                next(parser.stream)
+                next(parser.stream)
+                timeout = parser.parse_expression()
+            else:
+                parts.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_cache_support', [nodes.List(parts), timeout]),
+                               [], [], body).set_lineno(lineno)
+
+    def _cache_support(self, parts, timeout, caller):
+        key = tuple(str(p) for p in parts)
+        value = fragment_cache.get(key)
+        if value is None:
+            value = caller()
+            fragment_cache.set(key, value, timeout)
+        return value
+
+
+def fragment_version(rows, *related):
+    """Short hash of the column values of ``rows``, for use in fragment keys.
+
+    ``related`` names relationships shown in the fragment, e.g. 'pet' or
+    'owner'; their columns are hashed too, so a rename made by another
+    worker changes the key. Only loaded rows are read: load those
+    relationships eagerly or computing the version triggers lazy loads.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for row in rows:
+        for obj in (row, *(getattr(row, name) for name in related)):
+            values = tuple(getattr(obj, c.key) for c in obj.__table__.columns) if obj is not None else None
+            digest.update(repr(values).encode('utf-8'))
+    return digest.hexdigest()
+
+
+# ------------------- SETUP -------------------
+def init_template_cache(app, bytecode_dir=None):
+    """Enable the on-disk bytecode cache and the ``{% cache %}`` tag on ``app``."""
+    bytecode_dir = bytecode_dir or app.config.get('JINJA_BYTECODE_CACHE_DIR') or os.path.join(
+        os.path.dirname(__file__), 'instance', 'jinja_cache')
+    os.makedirs(bytecode_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(bytecode_dir)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.filters['fragment_version'] = fragment_version
+    app.extensions['fragment_cache'] = fragment_cache
+    return fragment_cache
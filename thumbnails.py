@@ -0,0 +1,30 @@
+"""Image work run in the photo process pool (see photos.py).
+
+Kept free of Flask and database imports so pool workers start quickly.
+"""
+import os
+
+THUMB_SIZE = (320, 320)
+DISPLAY_SIZE = (1280, 1280)
+
+
+def make_thumbnails(source, dest_dir, token):
+    """Write <token>_thumb.jpg, <token>_thumb.webp and <token>.webp next to the upload.
+
+    Returns True on success. Files that are not valid images are removed.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image).convert('RGB')
+            display = image.copy()
+            display.thumbnail(DISPLAY_SIZE)
+            display.save(os.path.join(dest_dir, f'{token}.webp'), 'WEBP', quality=80, method=4)
+            image.thumbnail(THUMB_SIZE)
+            image.save(os.path.join(dest_dir, f'{token}_thumb.jpg'), 'JPEG', quality=85, optimize=True, progressive=True)
+            image.save(os.path.join(dest_dir, f'{token}_thumb.webp'), 'WEBP', quality=80, method=4)
+        return True
+    except (UnidentifiedImageError, OSError):
+        os.remove(source)
+        return False
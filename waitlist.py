@@ -0,0 +1,163 @@
+"""Priority waitlist for fully booked days.
+
+When nobody is free for a booking, the customer can join the waitlist for
+that day and service. Entries are rows in ``waitlist``; each worker also
+keeps a min-heap per (day, service) of the waiting entries, ordered by
+urgency and then by when they joined, loaded with one indexed query the
+first time that key is needed.
+
+Deleting or moving an appointment notes its old slot on the session.
+After committing, the view calls promote_waitlist(), which pops the best
+entry for that day and service (O(log n), no scan) and books it into the
+freed slot. Entries are claimed with a conditional UPDATE, so one already
+promoted or cancelled by another worker is skipped; heaps are reloaded
+after INDEX_TTL seconds to pick up entries added elsewhere.
+"""
+import heapq
+import threading
+import time as clock
+from datetime import datetime
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session, object_session
+from booking_rules import clinic_hours_error
+from extensions import db
+from models import Appointment, WaitlistEntry
+from scheduler import assign_staff, confirm_staff
+
+INDEX_TTL = 60  # seconds before a (day, service) heap is reloaded from the table
+PROMOTION_QUERIES = 8  # statements one promotion runs; views that promote add it to their budget
+
+_heaps = {}  # (day, service) -> (loaded at, heap of (-urgency, created_at, id))
+_lock = threading.Lock()
+
+
+def _heap(day, service):
+    # Caller holds _lock
+    cached = _heaps.get((day, service))
+    if cached and clock.monotonic() - cached[0] < INDEX_TTL:
+        return cached[1]
+    t = WaitlistEntry.__table__
+    rows = db.session.execute(select(t.c.urgency, t.c.created_at, t.c.id).where(
+        t.c.day == day, t.c.service == service, t.c.status == 'Waiting')).all()
+    heap = [(-urgency, created_at, entry_id) for urgency, created_at, entry_id in rows]
+    heapq.heapify(heap)
+    _heaps[(day, service)] = (clock.monotonic(), heap)
+    return heap
+
+
+def join_waitlist(pet_id, owner_id, service, requested_at, urgency=0, notes=None, payment_method=None):
+    """Add a waiting entry for the day of ``requested_at`` and commit it."""
+    entry = WaitlistEntry(pet_id=pet_id, owner_id=owner_id, service=service, day=requested_at.date(),
+                          requested_at=requested_at, urgency=urgency, notes=notes,
+                          payment_method=payment_method, created_at=datetime.now())
+    db.session.add(entry)
+    db.session.commit()
+    with _lock:
+        cached = _heaps.get((entry.day, service))
+        if cached:
+            heapq.heappush(cached[1], (-entry.urgency, entry.created_at, entry.id))
+    return entry
+
+
+def cancel_entry(entry):
+    """Take a waiting entry off the waitlist; its heap item is dropped when it surfaces."""
+    if entry.status == 'Waiting':
+        entry.status = 'Cancelled'
+        db.session.commit()
+
+
+def promote_next(service, start):
+    """Book the best waiting entry for ``service`` into the slot at ``start``.
+
+    Returns the promoted entry, or None if nobody is waiting or the slot
+    isn't actually free for this service. The clinic may have closed the
+    day (a holiday exception) since the entries joined, so hours come first.
+    """
+    if clinic_hours_error(start):
+        return None
+    with _lock:
+        # Most freed slots have nobody waiting; skip the staff lookup for them
+        if not _heap(start.date(), service):
+            return None
+    staff_id = assign_staff(service, start)
+    if staff_id is None:
+        return None
+    while True:
+        with _lock:
+            heap = _heap(start.date(), service)
+            if not heap:
+                return None
+            entry_id = heapq.heappop(heap)[2]
+        now = datetime.now()
+        claimed = db.session.execute(
+            update(WaitlistEntry).where(WaitlistEntry.id == entry_id, WaitlistEntry.status == 'Waiting')
+            .values(status='Promoted', promoted_at=now)).rowcount
+        if claimed:
+            break
+    entry = db.session.get(WaitlistEntry, entry_id, populate_existing=True)
+    savepoint = db.session.begin_nested()
+    appt = Appointment(pet_id=entry.pet_id, owner_id=entry.owner_id, service=service, scheduled_at=start,
+                       notes=entry.notes, payment_method=entry.payment_method, staff_id=staff_id)
+    # Same initial statuses as a booking made through appointment_new
+    if entry.payment_method == 'pay_now':
+        appt.payment_status = 'Pending'
+        appt.status = 'Pending Payment'
+    else:
+        appt.payment_status = 'Pending Payment (On-site)'
+        appt.status = 'Scheduled'
+    db.session.add(appt)
+    if confirm_staff(appt) is None:
+        # A concurrent booking took the slot; put the entry back in line
+        savepoint.rollback()
+        entry.status = 'Waiting'
+        entry.promoted_at = None
+        with _lock:
+            heapq.heappush(_heap(start.date(), service), (-entry.urgency, entry.created_at, entry.id))
+        return None
+    savepoint.commit()
+    entry.appointment_id = appt.id
+    return entry
+
+
+def promote_waitlist():
+    """Fill the slots freed by the last commit from the waitlist; returns the promoted entries."""
+    slots = db.session.info.pop('freed_slots', [])
+    now = datetime.now()
+    promoted = []
+    for service, start in slots:
+        if start > now:
+            entry = promote_next(service, start)
+            if entry:
+                promoted.append(entry)
+    if promoted:
+        db.session.commit()
+    return promoted
+
+
+# ------------------- FREED SLOTS -------------------
+def _free(target, service, start):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('freed_slots', []).append((service, start))
+
+
+def forget_freed_slots(session, *args):
+    # Slots noted by a flush that was rolled back were never freed
+    session.info.pop('freed_slots', None)
+
+
+def slot_deleted(mapper, connection, target):
+    _free(target, target.service, target.scheduled_at)
+
+
+def slot_moved(mapper, connection, target):
+    attrs = inspect(target).attrs
+    old_service = attrs.service.history.deleted
+    old_start = attrs.scheduled_at.history.deleted
+    if old_service or old_start:
+        _free(target, old_service[0] if old_service else target.service,
+              old_start[0] if old_start else target.scheduled_at)
+
+event.listen(Appointment, 'after_delete', slot_deleted)
+event.listen(Appointment, 'after_update', slot_moved)
+event.listen(Session, 'after_rollback', forget_freed_slots)